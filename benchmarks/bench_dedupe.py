@@ -0,0 +1,94 @@
+"""Benchmarks delete_duplicates_add_keywords.
+
+Compares the previous groupby lambda implementation with the hashed key merge
+on synthetic events with duplicates, and checks that both keep the same rows
+with the same keywords. The previous implementation is skipped above
+--max-previous rows as it gets too slow.
+Run from the project root: python benchmarks/bench_dedupe.py --rows 10000 100000
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import time
+import random
+import argparse
+
+import pandas as pd
+
+from src.helper_utils import config_logger, main_logger_name
+from src.data_utils import delete_duplicates_add_keywords
+
+COLUMNS_TO_COMPARE = ["Name", "Long_Description", "Date", "Price"]
+KEYWORDS = ["ai", "web3", "blockchain", "design", "coding", "startup", "climate"]
+
+
+def synthetic_events(count, seed=0):
+    # every event is found about three times, by different keywords
+    rng = random.Random(seed)
+    events = [
+        {
+            "Name": f"Event {i}",
+            "Long_Description": f"Description of event {i}. " * 40,
+            "Date": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            "Price": str(i % 4 * 10),
+        }
+        for i in range(max(1, count // 3))
+    ]
+    return pd.DataFrame(
+        [dict(rng.choice(events), Keyword=rng.choice(KEYWORDS)) for _ in range(count)]
+    )
+
+
+def previous_implementation(data, columns_to_compare):
+    # the implementation delete_duplicates_add_keywords used before
+    data["Keyword"] = data.groupby(columns_to_compare)["Keyword"].transform(
+        lambda x: ",".join(set(x.str.split(",").sum()))
+    )
+    return data.drop_duplicates(subset=columns_to_compare, keep="first")
+
+
+def keyword_sets(df):
+    return df["Keyword"].map(lambda keywords: frozenset(keywords.split(",")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--max-previous", type=int, default=100000)
+    args = parser.parse_args()
+
+    config_logger(main_logger_name, lvl_console="error", lvl_root="error")
+
+    for rows in args.rows:
+        df = synthetic_events(rows)
+
+        start = time.perf_counter()
+        merged = delete_duplicates_add_keywords(
+            df.copy(), COLUMNS_TO_COMPARE, report=False
+        )
+        elapsed = time.perf_counter() - start
+        line = f"{rows:>8} rows: hashed {elapsed:7.3f}s  kept {len(merged)}"
+
+        if rows <= args.max_previous:
+            start = time.perf_counter()
+            previous = previous_implementation(df.copy(), COLUMNS_TO_COMPARE)
+            previous_elapsed = time.perf_counter() - start
+            identical = merged.index.equals(previous.index) and keyword_sets(
+                merged
+            ).equals(keyword_sets(previous))
+            line += (
+                f"  previous {previous_elapsed:7.3f}s  "
+                f"speedup {previous_elapsed / elapsed:5.1f}x  identical={identical}"
+            )
+            print(line)
+            if not identical:
+                sys.exit(1)
+        else:
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
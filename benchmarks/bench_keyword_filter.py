@@ -0,0 +1,108 @@
+"""Benchmarks the filter_for_keywords action of manipulate_csv_data.
+
+Compares the previous row by row implementation with the precompiled matcher
+on synthetic events, using the keywords from data/settings.json, and checks
+that both produce the same mask.
+Run from the project root: python benchmarks/bench_keyword_filter.py --rows 10000
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import json
+import time
+import random
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from src.data_utils import joined_text, keyword_mask, compile_keyword_matcher
+
+SETTINGS_PATH = Path(__file__).resolve().parent.parent / "data" / "settings.json"
+
+WORDS = (
+    "join us for an evening of talks drinks and good company in the city with "
+    "friends music food art community meetup group session hands-on open"
+).split()
+
+
+def load_operation(action):
+    with open(SETTINGS_PATH, "r", encoding="utf-8") as file:
+        operations = json.load(file)["CSV_OPERATIONS"]
+    return next(op for op in operations if op["action"] == action)
+
+
+def synthetic_events(count, keywords, seed=0):
+    rng = random.Random(seed)
+
+    def text(length):
+        words = [rng.choice(WORDS) for _ in range(length)]
+        if rng.random() < 0.3:  # about a third of the events mention a keyword
+            words.insert(rng.randrange(length), rng.choice(keywords).title())
+        return " ".join(words)
+
+    return pd.DataFrame(
+        {
+            "Name": [text(6) for _ in range(count)],
+            "Long_Description": [text(150) for _ in range(count)],
+            "Keyword": [rng.choice(keywords) for _ in range(count)],
+        }
+    )
+
+
+def iterrows_mask(df, columns, keywords, skip_columns):
+    # the implementation filter_for_keywords used before
+    mask = []
+    for index, row in df.iterrows():
+        row_text = " ".join(
+            str(row[column]).lower() for column in columns if column not in skip_columns
+        )
+        if any(keyword in row_text for keyword in keywords):
+            mask.append(True)
+        else:
+            mask.append(False)
+    return np.array(mask, dtype=bool)
+
+
+def matcher_mask(df, columns, keywords, skip_columns):
+    row_texts = joined_text(
+        df, [column for column in columns if column not in skip_columns]
+    )
+    return keyword_mask(row_texts, compile_keyword_matcher(keywords))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    args = parser.parse_args()
+
+    operation = load_operation("filter_for_keywords")
+    keywords = [kw.lower() for kw in operation["keywords"]]
+    columns = operation["columns"]
+    skip_columns = operation.get("skip_columns", [])
+
+    for rows in args.rows:
+        df = synthetic_events(rows, keywords)
+        timings = {}
+        masks = {}
+        for name, function in (("iterrows", iterrows_mask), ("matcher", matcher_mask)):
+            start = time.perf_counter()
+            masks[name] = function(df, columns, keywords, skip_columns)
+            timings[name] = time.perf_counter() - start
+
+        identical = np.array_equal(masks["iterrows"], masks["matcher"])
+        print(
+            f"{rows:>7} rows: iterrows {timings['iterrows']:7.3f}s  "
+            f"matcher {timings['matcher']:7.3f}s  "
+            f"speedup {timings['iterrows'] / timings['matcher']:5.1f}x  "
+            f"kept {int(masks['matcher'].sum())}  identical={identical}"
+        )
+        if not identical:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
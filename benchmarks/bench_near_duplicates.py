@@ -0,0 +1,102 @@
+"""Benchmarks merge_near_duplicates.
+
+Builds synthetic events of which a share is cross-posted a second time with
+slightly changed text (edited words, a different name punctuation and date
+format), and reports the run time with precision and recall of the merged
+duplicates. Time per row should stay flat as the row count grows.
+Run from the project root: python benchmarks/bench_near_duplicates.py --rows 10000 100000
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import time
+import random
+import argparse
+import datetime
+
+import pandas as pd
+
+from src.helper_utils import config_logger, main_logger_name
+from src.near_duplicates import merge_near_duplicates
+
+WORDS = (
+    "join us for an evening of talks drinks and good company in the city with "
+    "friends music food art community meetup group session hands-on open ai "
+    "founders climate design coding startup workshop panel investors berlin "
+    "product data engineers pitch demo learn build ship network speakers"
+).split()
+
+
+def synthetic_events(count, duplicate_share, edit_rate, seed=0):
+    rng = random.Random(seed)
+    start = datetime.date(2024, 1, 1)
+    rows = []
+    event = 0
+    while len(rows) < count:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(40, 200))]
+        name = " ".join(rng.choice(WORDS) for _ in range(5)).title()
+        day = start + datetime.timedelta(days=rng.randrange(90))
+        rows.append(
+            {
+                "Name": f"{name}: {event}",
+                "Long_Description": " ".join(words),
+                "Date": day.strftime("%B %d, %Y"),
+                "Source": "Eventbrite",
+                "Keyword": rng.choice(WORDS),
+                "Event": event,
+            }
+        )
+        if rng.random() < duplicate_share and len(rows) < count:
+            edited = [
+                rng.choice(WORDS) if rng.random() < edit_rate else word
+                for word in words
+            ]
+            rows.append(
+                {
+                    "Name": f"{name} - {event}",
+                    "Long_Description": " ".join(edited),
+                    "Date": day.strftime("%Y-%m-%d"),
+                    "Source": "Meetup",
+                    "Keyword": rng.choice(WORDS),
+                    "Event": event,
+                }
+            )
+        event += 1
+    rng.shuffle(rows)
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--duplicate-share", type=float, default=0.2)
+    parser.add_argument("--edit-rate", type=float, default=0.03)
+    parser.add_argument("--threshold", type=float, default=0.7)
+    args = parser.parse_args()
+
+    config_logger(main_logger_name, lvl_console="error", lvl_root="error")
+
+    for rows in args.rows:
+        df = synthetic_events(rows, args.duplicate_share, args.edit_rate)
+        start = time.perf_counter()
+        merged = merge_near_duplicates(df, threshold=args.threshold)
+        elapsed = time.perf_counter() - start
+
+        expected = len(df) - df["Event"].nunique()
+        removed = len(df) - len(merged)
+        # a wrong merge leaves an event without any of its rows
+        wrong = df["Event"].nunique() - merged["Event"].nunique()
+        missed = merged["Event"].duplicated().sum()
+        print(
+            f"{rows:>8} rows: {elapsed:7.2f}s  {elapsed / rows * 1e6:6.1f}us/row  "
+            f"removed {removed} of {expected} duplicates  "
+            f"recall {(expected - missed) / max(expected, 1):.3f}  "
+            f"wrong merges {wrong}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Benchmarks openai_loop_over_column_and_add against the local mock OpenAI server.
+
+Runs the summary stage over synthetic event sets and reports rows/s, retries
+and p50/p99 row latency. With --cache every size runs twice, cold and warm.
+Run from the project root: python benchmarks/bench_summaries.py --rows 100 1000
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import time
+import argparse
+import tempfile
+import threading
+
+import numpy as np
+import openai
+
+from src.helper_utils import config_logger, main_logger_name
+from src.token_bucket import configure_rate_limits, OPENAI, OPENAI_TOKENS
+from src.mock_openai_server import MockOpenAIServer
+from src.summary_cache import SummaryCache
+import src.openai_scripts as openai_scripts
+
+PROMPT = "Summarize the following event description in one sentence: "
+
+TOPICS = ["AI", "climate tech", "web3", "design", "coding", "networking"]
+
+
+def synthetic_descriptions(count):
+    return [
+        {
+            "Link": f"https://example.com/event/{i}",
+            "Long_Description": (
+                f"<p>Event {i} about {TOPICS[i % len(TOPICS)]}.</p>"
+                + f"<p>Join us for talks and networking around {TOPICS[i % len(TOPICS)]}. </p>"
+                * (1 + i % 5)
+            ),
+        }
+        for i in range(count)
+    ]
+
+
+class Instrumented:
+    """Times every row of the stage and counts the length retries by wrapping
+    the module level functions the loop calls."""
+
+    def __init__(self):
+        self.latencies = []
+        self.length_retries = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._originals = {}
+
+    def __enter__(self):
+        for name in ("summarize_text", "summarize_batch", "request_completion"):
+            self._originals[name] = getattr(openai_scripts, name)
+        openai_scripts.summarize_text = self._row(self._originals["summarize_text"])
+        openai_scripts.summarize_batch = self._row(self._originals["summarize_batch"])
+        openai_scripts.request_completion = self._request(
+            self._originals["request_completion"]
+        )
+        return self
+
+    def __exit__(self, *exc_info):
+        for name, function in self._originals.items():
+            setattr(openai_scripts, name, function)
+
+    def _row(self, function):
+        def wrapper(*args, **kwargs):
+            # the fallback of a batch calls summarize_text in the same thread
+            outer = getattr(self._local, "requests", None) is None
+            if outer:
+                self._local.requests = 0
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                if outer:
+                    elapsed = time.perf_counter() - start
+                    rows = len(args[2]) if isinstance(args[2], list) else 1
+                    with self._lock:
+                        self.latencies.extend([elapsed] * rows)
+                        self.length_retries += max(0, self._local.requests - 1)
+                    self._local.requests = None
+
+        return wrapper
+
+    def _request(self, function):
+        def wrapper(*args, **kwargs):
+            if getattr(self._local, "requests", None) is not None:
+                self._local.requests += 1
+            return function(*args, **kwargs)
+
+        return wrapper
+
+
+def run(server, rows, args, summary_cache=None):
+    data = synthetic_descriptions(rows)
+    requests_before = dict(server.requests)
+    with Instrumented() as instrumented:
+        start = time.perf_counter()
+        openai_scripts.openai_loop_over_column_and_add(
+            api_key="mock",
+            prompt=PROMPT,
+            data=[row["Long_Description"] for row in data],
+            column_for_input="data",
+            column_for_output="Summary",
+            char_max=170,
+            char_min=48,
+            to_remove=['"'],
+            max_workers=args.max_workers,
+            summary_cache=summary_cache,
+            batch_size=args.batch_size,
+            candidates=args.candidates,
+            max_attempts=args.max_attempts,
+            prepare_input=args.prepare_input,
+            max_input_tokens=args.max_input_tokens,
+        )
+        elapsed = time.perf_counter() - start
+
+    requests = {
+        key: value - requests_before.get(key, 0)
+        for key, value in server.requests.items()
+    }
+    errors = sum(requests.get(status, 0) for status in ("429", "500", "503"))
+    latencies = np.array(instrumented.latencies or [0.0]) * 1000
+    return {
+        "elapsed": elapsed,
+        "rows/s": rows / elapsed,
+        "requests": requests.get("POST", 0),
+        "length retries": instrumented.length_retries,
+        "error retries": errors,
+        "p50 ms": np.percentile(latencies, 50),
+        "p99 ms": np.percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-workers", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--candidates", type=int, default=1)
+    parser.add_argument("--max-attempts", type=int, default=None)
+    parser.add_argument("--prepare-input", action="store_true")
+    parser.add_argument("--max-input-tokens", type=int, default=None)
+    parser.add_argument("--cache", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config_logger(main_logger_name, lvl_console="error", lvl_root="error")
+    # the mock server has no limit, so the client limiters are opened up as well
+    configure_rate_limits(
+        {
+            OPENAI: {"tokens": 1000, "fill_rate": 1000},
+            OPENAI_TOKENS: {"tokens": 10**9, "fill_rate": 10**9},
+        }
+    )
+
+    with MockOpenAIServer(
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limit_rate=args.rate_limit_rate,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    ) as server:
+        openai.api_base = server.api_base
+        for rows in args.rows:
+            runs = [("cold", None)]
+            if args.cache:
+                cache_dir = tempfile.mkdtemp()
+                summary_cache = SummaryCache(Path(cache_dir) / "summaries.sqlite")
+                runs = [("cold", summary_cache), ("warm", summary_cache)]
+            for label, summary_cache in runs:
+                result = run(server, rows, args, summary_cache)
+                print(
+                    f"{rows:>6} rows {label}: {result['elapsed']:7.2f}s  "
+                    f"{result['rows/s']:8.1f} rows/s  {result['requests']} requests  "
+                    f"retries length={result['length retries']} "
+                    f"errors={result['error retries']}  "
+                    f"p50={result['p50 ms']:.0f}ms p99={result['p99 ms']:.0f}ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
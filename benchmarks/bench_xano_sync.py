@@ -0,0 +1,91 @@
+"""Benchmarks send_data_to_xano against the local mock Xano server.
+
+Compares the per-request mode with the bulk mode on a synthetic event set.
+Run from the project root: python benchmarks/bench_xano_sync.py --rows 1000
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import time
+import argparse
+import datetime
+
+from src.helper_utils import config_logger, main_logger_name
+from src.token_bucket import configure_rate_limits, XANO_CRUD, XANO_IMAGE
+from src.mock_xano_server import MockXanoServer
+from src.http_session import get_connection_stats
+from src.xano_scripts import send_data_to_xano
+
+
+def synthetic_events(count, start=0):
+    date = (datetime.date.today() + datetime.timedelta(days=30)).strftime("%Y-%m-%d")
+    return [
+        {
+            "Link": f"https://example.com/event/{i}",
+            "Name": f"Event {i}",
+            "Date": date,
+            "Long_Description": f"Description of event {i}",
+            "Price": float(i % 3),
+            "Photo": None,
+            "Archived": False,
+        }
+        for i in range(start, start + count)
+    ]
+
+
+def run(rows, latency, max_workers, bulk_size, use_bulk):
+    with MockXanoServer(latency=latency) as server:
+        # half of the rows already exist, a quarter of those with changes
+        existing = synthetic_events(rows // 2)
+        for event in existing[: rows // 8]:
+            event["Name"] += " (old)"
+        server.add_records(existing)
+
+        endpoints = server.endpoints()
+        if not use_bulk:
+            endpoints.pop("bulk_endpoint_url")
+
+        start = time.perf_counter()
+        response_list = send_data_to_xano(
+            data=synthetic_events(rows),
+            api_key="mock",
+            table_name="events",
+            max_workers=max_workers,
+            bulk_size=bulk_size,
+            page_size=500,
+            **endpoints,
+        )
+        elapsed = time.perf_counter() - start
+        connections = get_connection_stats().get(server.url, {})
+        return elapsed, len(response_list), dict(server.requests), connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--max-workers", type=int, default=4)
+    parser.add_argument("--bulk-size", type=int, default=50)
+    args = parser.parse_args()
+
+    config_logger(main_logger_name, lvl_console="warning", lvl_root="warning")
+    # the mock server has no limit, so the client limiters are opened up as well
+    unlimited = {"tokens": 1000, "fill_rate": 1000}
+    configure_rate_limits({XANO_CRUD: unlimited, XANO_IMAGE: unlimited})
+
+    for use_bulk in (False, True):
+        elapsed, responses, requests, connections = run(
+            args.rows, args.latency, args.max_workers, args.bulk_size, use_bulk
+        )
+        mode = f"bulk ({args.bulk_size})" if use_bulk else "per request"
+        print(
+            f"{mode:>12}: {elapsed:7.2f}s  {args.rows / elapsed:8.1f} rows/s  "
+            f"{responses} responses  requests={requests}  connections={connections}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,9 @@ from termcolor import colored
 import os
 
 from src.helper_utils import load_settings
+from src.token_bucket import configure_rate_limits
+from src.http_session import configure_session, log_connection_stats
+from src.retry_policy import configure_retry_policy
 
 # event collection
 from src.eventbrite_scripts import get_all_events_info, create_eventbrite_object
@@ -29,6 +32,7 @@ from src.meetup_scripts import scrape_meetup
 
 # ai summary
 from src.openai_scripts import openai_loop_over_column_and_add
+from src.summary_cache import SummaryCache
 
 # data manipulation
 from src.data_utils import (
@@ -40,9 +44,15 @@ from src.data_utils import (
     load_from_csv,
     json_read,
 )
+from src.near_duplicates import merge_near_duplicates
 
 # send to db
-from src.xano_scripts import send_data_to_xano
+from src.xano_scripts import (
+    send_data_to_xano,
+    fetch_existing_records,
+    reuse_existing_summaries,
+)
+from src.image_cache import ImageCache
 
 
 def main():
@@ -54,6 +64,9 @@ def main():
         settings_path = r"C:\Users\emilr\Code\PythonProjects\openaiapi\meetupsummary\data\settings.json"
         logger.info(f"Loading settings from: {os.path.basename(settings_path)}")
         settings = load_settings(settings_path, load_secrets=True)
+        configure_rate_limits(settings["RATE_LIMITS"])
+        configure_session(settings["HTTP_POOL"])
+        configure_retry_policy(settings["RETRY_POLICY"], settings["CIRCUIT_BREAKER"])
 
         # SCRAPER
         # # EVENTBRITE
@@ -93,6 +106,8 @@ def main():
             data=df,
             columns_to_compare=["Name", "Long_Description", "Date", "Price"],
         )
+        # # # merging events cross-posted with slightly different text
+        df = merge_near_duplicates(df, **settings["NEAR_DUPLICATES"])
         # # # df manipulation operations
         df = manipulate_csv_data(
             input_df=df,
@@ -108,6 +123,16 @@ def main():
         df["Archived"] = False
 
         # APIs
+        # # XANO SNAPSHOT
+        # taken before the summaries so unchanged descriptions keep their summary
+        existing_entries = fetch_existing_records(
+            api_key=settings["XANO_API_KEY"],
+            get_all_endpoint_url=settings["XANO_ENDPOINT_GET_ALL"],
+            page_size=settings["XANO_PAGE_SIZE"],
+            keep_entries=settings["XANO_ENDPOINT_GET"] is None,
+        )
+        df = reuse_existing_summaries(df, existing_entries)
+
         # # OPENAI
         df = openai_loop_over_column_and_add(
             api_key=settings["OPENAI_API_KEY"],
@@ -119,6 +144,15 @@ def main():
             char_max=170,
             char_min=48,
             to_remove=['"'],
+            max_workers=settings["OPENAI_MAX_WORKERS"],
+            summary_cache=SummaryCache(**settings["SUMMARY_CACHE"]),
+            batch_size=settings["OPENAI_BATCH_SIZE"],
+            candidates=settings["OPENAI_CANDIDATES"],
+            max_attempts=settings["OPENAI_MAX_ATTEMPTS"],
+            prepare_input=True,
+            max_input_tokens=settings["OPENAI_MAX_INPUT_TOKENS"],
+            checkpoint_path=settings["OPENAI_CHECKPOINT_PATH"],
+            skip_existing=True,
         )
 
         # # XANO
@@ -128,10 +162,23 @@ def main():
             image_endpoint_url=settings["XANO_ENDPOINT_IMAGE"],
             send_endpoint_url=settings["XANO_ENDPOINT_POST"],
             check_endpoint_url=settings["XANO_ENDPOINT_GET_ALL"],
+            get_endpoint_url=settings["XANO_ENDPOINT_GET"],
             edit_endpoint_url=settings["XANO_ENDPOINT_EDIT"],
             delete_endpoint_url=settings["XANO_ENDPOINT_DELETE"],
             table_name=settings["XANO_TABLE_NAME"],
+            max_workers=settings["XANO_MAX_WORKERS"],
+            image_cache=ImageCache(**settings["IMAGE_CACHE"]),
+            image_preset=settings["IMAGE_PRESET"],
+            image_processes=settings["IMAGE_PROCESSES"],
+            page_size=settings["XANO_PAGE_SIZE"],
+            bulk_endpoint_url=settings["XANO_ENDPOINT_BULK"],
+            bulk_size=settings["XANO_BULK_SIZE"],
+            plan_path=settings["XANO_PLAN_PATH"],
+            dry_run=settings["XANO_DRY_RUN"],
+            journal_path=settings["XANO_JOURNAL_PATH"],
+            existing_entries=existing_entries,
         )
+        log_connection_stats()
 
         end_time = time.time()
         logger.info(f"End: {end_time}")
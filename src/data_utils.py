@@ -6,6 +6,7 @@ logger = logging.getLogger(logger_name)
 
 
 import pandas as pd
+import re
 import json
 import tempfile
 import shutil
@@ -13,7 +14,12 @@ import os
 from pathlib import Path
 import uuid
 import numpy as np
-from langdetect import detect
+from src.language_detection import (
+    LanguageCache,
+    detect_languages,
+    SAMPLE_CHARS,
+    DETECTION_SEED,
+)
 
 
 # general data work
@@ -183,33 +189,58 @@ def delete_duplicates(data, columns_to_compare=None):
     return df_no_duplicates  # return the DataFrame object
 
 
-def delete_duplicates_add_keywords(data, columns_to_compare=None):
+def delete_duplicates_add_keywords(data, columns_to_compare=None, report=True):
+    """Keeps the first of the rows that are equal in columns_to_compare (all
+    but Keyword if None) and gives it the keywords of all of them, unique and
+    in the order they first appear. report=True logs every row that gained
+    keywords, the total is always logged."""
     if isinstance(data, str):  # if the input is a file path
         data = pd.read_csv(data)
 
-    original_data = data.copy()  # copy the original data to compare later
+    if columns_to_compare is None:
+        columns_to_compare = [column for column in data.columns if column != "Keyword"]
 
-    # Convert 'Keyword' to a set, which removes duplicates within each group
-    data["Keyword"] = data.groupby(columns_to_compare)["Keyword"].transform(
-        lambda x: ",".join(set(x.str.split(",").sum()))
-    )
+    # one hash per row instead of grouping by the wide text columns
+    keys = pd.util.hash_pandas_object(data[list(columns_to_compare)], index=False)
+    keys = keys.to_numpy()
 
     # Keep one instance of each event with the same name, remove others
-    df_no_duplicates = data.drop_duplicates(subset=columns_to_compare, keep="first")
+    first = ~pd.Series(keys).duplicated().to_numpy()
+    df_no_duplicates = data[first].copy()
+    df_no_duplicates["Keyword"] = merge_values_per_key(
+        data["Keyword"], keys, keys[first], df_no_duplicates["Keyword"]
+    )
 
-    # Print the indexes and keywords
     added_keywords_rows = df_no_duplicates[
         df_no_duplicates["Keyword"].str.contains(",", na=False)
     ]
-    indexes_and_keywords = added_keywords_rows[["Keyword"]]
-    logger.info("Rows that gained keywords:")
-    with pd.option_context("display.max_rows", None, "display.max_columns", None):
-        logger.info(indexes_and_keywords)
-    logger.info(f"Total rows that gained keywords: {indexes_and_keywords.shape[0]}")
+    if report:
+        # Print the indexes and keywords
+        indexes_and_keywords = added_keywords_rows[["Keyword"]]
+        logger.info("Rows that gained keywords:")
+        with pd.option_context("display.max_rows", None, "display.max_columns", None):
+            logger.info(indexes_and_keywords)
+    logger.info(f"Total rows that gained keywords: {added_keywords_rows.shape[0]}")
 
     return df_no_duplicates
 
 
+def merge_values_per_key(values, keys, kept_keys, kept_values):
+    """Joins the comma separated values of all rows with the same key, unique
+    and in the order they first appear, for the kept row of every key. Keys
+    without any value and keys of a single row keep kept_values."""
+    shared = pd.Series(keys).duplicated(keep=False).to_numpy()
+    exploded = pd.DataFrame(
+        {
+            "key": keys[shared],
+            "value": values[shared].astype("string").str.split(",").to_numpy(),
+        }
+    ).explode("value")
+    exploded = exploded[exploded["value"].fillna("") != ""].drop_duplicates()
+    merged = exploded.groupby("key", sort=False)["value"].agg(",".join)
+    return pd.Series(kept_keys, index=kept_values.index).map(merged).fillna(kept_values)
+
+
 def map_keywords_to_categories(keywords, category_dict):
     if pd.isnull(keywords):  # Add this check to handle NaN values (which are floats)
         return ""
@@ -228,6 +259,100 @@ def map_keywords_to_categories(keywords, category_dict):
     return ",".join(categories)
 
 
+def compile_keyword_matcher(keywords, regex=False):
+    """One precompiled regex that finds any of the keywords in a single scan.
+
+    Keywords are literal substrings, merged into a trie shaped pattern
+    (business, blockchain -> b(?:usiness|lockchain)) as python's regex engine
+    tries the branches of a flat alternation one by one at every position of
+    the text. With regex=True they are case insensitive regular expressions,
+    each in a named group so matched_keyword can tell which one matched."""
+    if not keywords:
+        return re.compile(r"(?!)")  # matches nothing, like any() over no keywords
+    if regex:
+        return re.compile(
+            "|".join(f"(?P<k{i}>{keyword})" for i, keyword in enumerate(keywords)),
+            re.IGNORECASE,
+        )
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return re.compile(_trie_pattern(trie))
+
+
+def _trie_pattern(node):
+    # a keyword ending here already matches, longer ones add nothing
+    if "" in node:
+        return ""
+    branches = [
+        re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items())
+    ]
+    return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+
+def matched_keyword(match, keywords):
+    if match.lastgroup is not None:  # regex keywords
+        return keywords[int(match.lastgroup[1:])]
+    return match.group()
+
+
+def filter_out_mask(df, columns, keywords, regex=False):
+    """Marks the rows where any of the columns contains one of the keywords.
+    Every column is scanned once with one matcher and only the rows that did
+    not match yet are searched, so memory stays flat however many keywords
+    there are. Returns the mask and the matched keyword and column per row."""
+    if not regex:
+        keywords = [keyword.lower() for keyword in keywords]
+    matcher = compile_keyword_matcher(keywords, regex=regex)
+
+    mask = np.zeros(len(df), dtype=bool)
+    matches = np.full(len(df), None, dtype=object)
+    for column in columns:
+        texts = df[column].str.lower().to_numpy(dtype=object)
+        for i in np.flatnonzero(~mask):
+            if not isinstance(texts[i], str):
+                continue
+            match = matcher.search(texts[i])
+            if match is not None:
+                mask[i] = True
+                matches[i] = (matched_keyword(match, keywords), column)
+    return mask, matches
+
+
+def log_filtered_out(df, mask, matches):
+    for index, (keyword, column) in zip(df.index[mask], matches[mask]):
+        logger.debug(f"Filtered out row {index}: '{keyword}' in {column}")
+    counts = pd.Series([keyword for keyword, column in matches[mask]], dtype="object")
+    logger.info(
+        f"Filtered out {int(mask.sum())} rows by keyword: "
+        f"{counts.value_counts().to_dict()}"
+    )
+
+
+def joined_text(df, columns):
+    """The lowercased values of the columns joined by spaces, per row."""
+    if not columns:
+        return pd.Series("", index=df.index, dtype="object")
+    # map(str) rather than astype(str), which keeps NaN as NaN on string
+    # columns of newer pandas, so missing cells read "nan" like str() does
+    texts = [df[column].map(str).str.lower() for column in columns]
+    joined = texts[0]
+    for text in texts[1:]:
+        joined = joined + " " + text
+    return joined
+
+
+def keyword_mask(texts, matcher):
+    return np.fromiter(
+        (matcher.search(text) is not None for text in texts),
+        dtype=bool,
+        count=len(texts),
+    )
+
+
 def manipulate_csv_data(
     file_path=None, output_filepath=None, operations=None, input_df=None
 ):
@@ -297,38 +422,47 @@ def manipulate_csv_data(
                     operation["old_text"], operation["new_text"], regex=True
                 )
             elif action == "filter_out_keywords":
-                keywords = [keyword.lower() for keyword in operation["keywords"]]
-                columns = operation["columns"]
-                mask = np.logical_or.reduce(
-                    [
-                        df[column].str.lower().str.contains(keyword, na=False)
-                        for keyword in keywords
-                        for column in columns
-                    ]
+                # literal substrings unless the operation sets "regex": true
+                mask, matches = filter_out_mask(
+                    df,
+                    operation["columns"],
+                    operation["keywords"],
+                    regex=operation.get("regex", False),
                 )
+                log_filtered_out(df, mask, matches)
                 df = df[~mask]
             elif action == "language_filter":
                 languages = operation["languages"]
                 column = operation["column_name"]
-                mask = df[column].apply(
-                    lambda x: detect(x) in languages if x else False
+                known_column = operation.get("known_language_column")
+                language_cache = None
+                if operation.get("cache_path"):
+                    language_cache = LanguageCache(operation["cache_path"])
+                detected = detect_languages(
+                    df[column].tolist(),
+                    known_languages=(
+                        df[known_column].tolist()
+                        if known_column in df.columns
+                        else None
+                    ),
+                    sample_chars=operation.get("sample_chars", SAMPLE_CHARS),
+                    seed=operation.get("seed", DETECTION_SEED),
+                    max_workers=operation.get("max_workers"),
+                    language_cache=language_cache,
                 )
+                if language_cache:
+                    language_cache.log_stats()
+                mask = np.array([lang in languages for lang in detected], dtype=bool)
                 df = df[mask]
             elif action == "filter_for_keywords":
                 columns = operation["columns"]
                 keywords = [kw.lower() for kw in operation["keywords"]]
                 skip_columns = operation.get("skip_columns", [])
-                mask = []
-                for index, row in df.iterrows():
-                    row_text = " ".join(
-                        str(row[column]).lower()
-                        for column in columns
-                        if column not in skip_columns
-                    )
-                    if any(keyword in row_text for keyword in keywords):
-                        mask.append(True)
-                    else:
-                        mask.append(False)
+                # keywords may match across the joined columns as before
+                row_texts = joined_text(
+                    df, [column for column in columns if column not in skip_columns]
+                )
+                mask = keyword_mask(row_texts, compile_keyword_matcher(keywords))
                 df = df[mask]
             else:
                 logger.error(f"Invalid action '{action}'")
@@ -0,0 +1,83 @@
+import logging
+from src.helper_utils import main_logger_name
+
+logger_name = main_logger_name
+logger = logging.getLogger(logger_name)
+
+
+import pandas as pd
+
+
+# the formats of the scraped sources, plus the ISO timestamps Xano returns
+DATE_FORMATS = ("%B %d, %Y", "%Y-%m-%d", "%m/%d/%Y", "ISO8601")
+
+ISO_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+# source -> format that parsed most of its dates last time
+_format_cache = {}
+
+
+def _to_datetime(values, fmt):
+    if fmt == "ISO8601":
+        # the local date and time count, a utc offset is dropped
+        values = values.str[:19]
+    return pd.to_datetime(values, format=fmt, errors="coerce")
+
+
+def _parse_source(values, source):
+    cached = _format_cache.get(source)
+    formats = [cached] if cached else []
+    formats += [fmt for fmt in DATE_FORMATS if fmt != cached]
+
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    remaining = values
+    best_format, best_count = None, 0
+    for fmt in formats:
+        if remaining.empty:
+            break
+        attempt = _to_datetime(remaining, fmt)
+        matched = attempt.notna()
+        if matched.sum() > best_count:
+            best_format, best_count = fmt, matched.sum()
+        parsed[attempt.index[matched]] = attempt[matched]
+        remaining = remaining[~matched]
+
+    if best_format is not None and best_format != cached:
+        logger.debug(f"Inferred date format {best_format} for source {source!r}")
+        _format_cache[source] = best_format
+    return parsed
+
+
+def parse_dates(values, sources=None, errors="raise"):
+    """Parses a whole column of dates in one pass and returns a datetime64
+    Series with NaT for missing dates.
+
+    Rows are grouped by their source (e.g. the Source column) and the format
+    that fit a source before is tried first, so a source with a consistent
+    format costs a single vectorized parse. errors="raise" fails on dates none
+    of DATE_FORMATS can parse, "coerce" leaves them NaT."""
+    values = pd.Series(values, dtype="object")
+    values = values.where(values.notna() & (values != ""))
+    if sources is None:
+        sources = pd.Series("", index=values.index)
+    else:
+        sources = pd.Series(sources, index=values.index, dtype="object").fillna("")
+
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    present = values.notna()
+    for source, group in values[present].groupby(sources[present], sort=False):
+        parsed[group.index] = _parse_source(group.astype(str), source)
+
+    unparsed = present & parsed.isna()
+    if unparsed.any() and errors == "raise":
+        logger.error(f"No valid date format found for text: {values[unparsed].iloc[0]}")
+        raise ValueError("No valid date format found")
+    return parsed
+
+
+def to_iso(dates):
+    """ISO strings as datetime.isoformat() writes them, None for NaT."""
+    return [
+        date if isinstance(date, str) else None
+        for date in pd.Series(dates).dt.strftime(ISO_FORMAT)
+    ]
@@ -139,8 +139,10 @@ def load_settings(settings_path, load_secrets=False):
             "XANO_ENDPOINT_POST": os.getenv("XANO_ENDPOINT_POST"),
             "XANO_ENDPOINT_IMAGE": os.getenv("XANO_ENDPOINT_IMAGE"),
             "XANO_ENDPOINT_GET_ALL": os.getenv("XANO_ENDPOINT_GET_ALL"),
+            "XANO_ENDPOINT_GET": os.getenv("XANO_ENDPOINT_GET"),
             "XANO_ENDPOINT_EDIT": os.getenv("XANO_ENDPOINT_EDIT"),
             "XANO_ENDPOINT_DELETE": os.getenv("XANO_ENDPOINT_DELETE"),
+            "XANO_ENDPOINT_BULK": os.getenv("XANO_ENDPOINT_BULK"),
             "XANO_TABLE_NAME": os.getenv("XANO_TABLE_NAME"),
         }
 
@@ -0,0 +1,72 @@
+import logging
+from src.helper_utils import main_logger_name
+
+logger_name = main_logger_name
+logger = logging.getLogger(logger_name)
+
+
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# pool_connections is the number of hosts kept, pool_maxsize the number of
+# open connections per host and should be at least the number of workers
+DEFAULT_POOL_SETTINGS = {"pool_connections": 10, "pool_maxsize": 16}
+
+_pool_settings = dict(DEFAULT_POOL_SETTINGS)
+_session = None
+_session_lock = threading.Lock()
+
+
+def configure_session(pool_settings):
+    """Overrides the pool sizes, e.g. with the HTTP_POOL settings entry. The
+    shared session is rebuilt on the next get_session."""
+    global _session
+    with _session_lock:
+        _pool_settings.update(pool_settings or {})
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_session():
+    """Returns the process wide session all Xano and image requests go through,
+    so connections are kept alive and reused per host instead of opening a new
+    TCP+TLS connection for every request."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(**_pool_settings)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def get_connection_stats():
+    """Returns the number of requests and newly opened connections per host."""
+    stats = {}
+    with _session_lock:
+        if _session is None:
+            return stats
+        adapters = {id(a): a for a in _session.adapters.values()}.values()
+        for adapter in adapters:
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                host = f"{pool.scheme}://{pool.host}:{pool.port}"
+                host_stats = stats.setdefault(host, {"requests": 0, "connections": 0})
+                host_stats["requests"] += pool.num_requests
+                host_stats["connections"] += pool.num_connections
+    for host_stats in stats.values():
+        host_stats["reused"] = host_stats["requests"] - host_stats["connections"]
+    return stats
+
+
+def log_connection_stats():
+    for host, host_stats in get_connection_stats().items():
+        logger.info(
+            f"{host}: {host_stats['requests']} requests over "
+            f"{host_stats['connections']} connections "
+            f"({host_stats['reused']} reused)"
+        )
@@ -0,0 +1,178 @@
+import logging
+from src.helper_utils import main_logger_name
+
+logger_name = main_logger_name
+logger = logging.getLogger(logger_name)
+
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+
+
+class ImageCache:
+    """On-disk cache for converted event photos and their Xano upload metadata.
+
+    Source urls map to the content hash of the converted JPEG together with the
+    ETag/Last-Modified they were downloaded with. The JPEG files and the Xano
+    image metadata are stored per content hash, so the same photo behind two
+    urls is only uploaded once. Files are evicted least recently used first
+    once the cache grows over max_bytes."""
+
+    def __init__(self, cache_dir, max_bytes=500 * 1024**2, revalidate_after=7 * 86400):
+        self.cache_dir = Path(cache_dir)
+        self.image_dir = self.cache_dir / "images"
+        self.image_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._upload_locks = {}
+        self._db = sqlite3.connect(
+            str(self.cache_dir / "index.sqlite"), check_same_thread=False
+        )
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, "
+                "content_hash TEXT, etag TEXT, last_modified TEXT, checked_at REAL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS images (content_hash TEXT PRIMARY KEY, "
+                "size INTEGER, last_access REAL, xano_metadata TEXT)"
+            )
+
+    def _image_path(self, content_hash):
+        return self.image_dir / f"{content_hash}.jpg"
+
+    def lookup(self, url):
+        """Returns the cached validators and content hash for a url or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content_hash, etag, last_modified, checked_at FROM urls WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        content_hash, etag, last_modified, checked_at = row
+        if not self._image_path(content_hash).exists():
+            return None
+        return {
+            "content_hash": content_hash,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": time.time() - checked_at < self.revalidate_after,
+        }
+
+    def conditional_headers(self, url):
+        """Request headers to revalidate a cached url with the image host."""
+        cached = self.lookup(url)
+        headers = {}
+        if cached is not None:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+        return headers
+
+    def mark_validated(self, url):
+        """Records that the host confirmed the cached image (HTTP 304)."""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE urls SET checked_at = ? WHERE url = ?", (time.time(), url)
+            )
+
+    def get_image(self, content_hash):
+        path = self._image_path(content_hash)
+        try:
+            jpg_image = path.read_bytes()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touch(content_hash)
+        return jpg_image
+
+    def put_image(self, url, jpg_image, etag=None, last_modified=None):
+        """Stores the converted image for the url and returns its content hash."""
+        content_hash = hashlib.sha256(jpg_image).hexdigest()
+        path = self._image_path(content_hash)
+        if not path.exists():
+            tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(jpg_image)
+            os.replace(tmp_path, path)
+
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO urls VALUES (?, ?, ?, ?, ?)",
+                (url, content_hash, etag, last_modified, now),
+            )
+            self._db.execute(
+                "INSERT INTO images VALUES (?, ?, ?, NULL) ON CONFLICT(content_hash) "
+                "DO UPDATE SET last_access = excluded.last_access",
+                (content_hash, len(jpg_image), now),
+            )
+        self.evict()
+        return content_hash
+
+    def upload_lock(self, content_hash):
+        """Lock held while a photo is looked up and uploaded, so concurrent rows
+        sharing the photo wait for the first upload instead of repeating it."""
+        with self._lock:
+            return self._upload_locks.setdefault(content_hash, threading.Lock())
+
+    def get_xano_metadata(self, content_hash):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT xano_metadata FROM images WHERE content_hash = ?",
+                (content_hash,),
+            ).fetchone()
+        if row is None or row[0] is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touch(content_hash)
+        return json.loads(row[0])
+
+    def put_xano_metadata(self, content_hash, metadata):
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE images SET xano_metadata = ? WHERE content_hash = ?",
+                (json.dumps(metadata), content_hash),
+            )
+
+    def _touch(self, content_hash):
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE images SET last_access = ? WHERE content_hash = ?",
+                (time.time(), content_hash),
+            )
+
+    def evict(self):
+        """Deletes the least recently used images until the cache fits max_bytes."""
+        with self._lock, self._db:
+            rows = self._db.execute(
+                "SELECT content_hash, size FROM images ORDER BY last_access DESC"
+            ).fetchall()
+            total = 0
+            evicted = []
+            for content_hash, size in rows:
+                total += size
+                if total > self.max_bytes:
+                    evicted.append(content_hash)
+            for content_hash in evicted:
+                self._db.execute(
+                    "DELETE FROM images WHERE content_hash = ?", (content_hash,)
+                )
+                self._db.execute(
+                    "DELETE FROM urls WHERE content_hash = ?", (content_hash,)
+                )
+                self._image_path(content_hash).unlink(missing_ok=True)
+        if evicted:
+            logger.debug(f"Evicted {len(evicted)} images from the image cache.")
@@ -0,0 +1,193 @@
+import logging
+from src.helper_utils import main_logger_name
+
+logger_name = main_logger_name
+logger = logging.getLogger(logger_name)
+
+
+import pandas as pd
+
+from io import BytesIO
+from PIL import Image
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from src.token_bucket import get_bucket, IMAGE_CDN
+from src.http_session import get_session
+
+
+# max_size is the bounding box the image is shrunk into, None keeps the size
+IMAGE_PRESETS = {
+    "original": {
+        "max_size": None,
+        "quality": 75,
+        "progressive": False,
+        "optimize": False,
+    },
+    "banner": {
+        "max_size": (1280, 720),
+        "quality": 80,
+        "progressive": True,
+        "optimize": True,
+    },
+    "thumbnail": {
+        "max_size": (480, 270),
+        "quality": 70,
+        "progressive": True,
+        "optimize": True,
+    },
+}
+DEFAULT_PRESET = "original"  # same output as the previous convert_image_to_jpg
+
+
+def is_valid_image_url(image_url):
+    return not (pd.isna(image_url) or image_url == "NaN" or not image_url)
+
+
+def image_cache_key(image_url, preset=DEFAULT_PRESET):
+    # converted images differ per preset so each preset gets its own cache entry
+    return image_url if preset == DEFAULT_PRESET else f"{image_url}#{preset}"
+
+
+def transcode_image(
+    content, max_size=None, quality=75, progressive=False, optimize=False
+):
+    """Decodes any PIL readable image and re-encodes it as JPEG bytes."""
+    img = Image.open(BytesIO(content))
+
+    if max_size:
+        # lets the JPEG decoder skip detail that would be thrown away anyway
+        img.draft("RGB", max_size)
+
+    # If the image has a palette, convert it to RGBA
+    if img.mode == "P":
+        img = img.convert("RGBA")
+    img = img.convert("RGB")
+
+    if max_size:
+        img.thumbnail(max_size, Image.LANCZOS)
+
+    with BytesIO() as output:
+        img.save(
+            output,
+            "JPEG",
+            quality=quality,
+            optimize=optimize,
+            progressive=progressive,
+        )
+        return output.getvalue()
+
+
+def download_image(image_url, image_cache=None, preset=DEFAULT_PRESET):
+    """Returns (jpg_image, None) when the cache can serve the url and
+    (None, response) when the source image had to be downloaded."""
+    cache_key = image_cache_key(image_url, preset)
+    cached = image_cache.lookup(cache_key) if image_cache is not None else None
+    if cached is not None and cached["fresh"]:
+        jpg_image = image_cache.get_image(cached["content_hash"])
+        if jpg_image is not None:
+            return jpg_image, None
+
+    # revalidate a stale cache entry instead of downloading the image again
+    request_headers = (
+        image_cache.conditional_headers(cache_key) if cached is not None else {}
+    )
+
+    get_bucket(IMAGE_CDN).acquire()
+
+    response = get_session().get(image_url, headers=request_headers)
+    if response.status_code == 304 and cached is not None:
+        jpg_image = image_cache.get_image(cached["content_hash"])
+        if jpg_image is not None:
+            image_cache.mark_validated(cache_key)
+            return jpg_image, None
+        response = get_session().get(image_url)
+    if response.status_code != 200:
+        logger.error(f"Failed to download image from {image_url}")
+        raise Exception(f"Failed to download image from {image_url}")
+    return None, response
+
+
+def store_image(image_cache, image_url, preset, jpg_image, response):
+    if image_cache is not None:
+        image_cache.put_image(
+            image_cache_key(image_url, preset),
+            jpg_image,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+
+
+def prepare_images(
+    image_urls,
+    preset=DEFAULT_PRESET,
+    image_cache=None,
+    max_processes=None,
+    download_workers=8,
+    chunk_size=32,
+):
+    """Downloads the images concurrently and transcodes them on a process pool.
+
+    Urls are handled chunk_size at a time, so at most one chunk of source
+    images is held in memory (and pickled for the pool) before it is dropped.
+    Returns a dict of url -> jpg bytes for every image that was (re)converted.
+    Urls that are still fresh in the image cache are left out since the cache
+    serves them anyway; urls that fail are left out and logged."""
+    image_urls = list(dict.fromkeys(u for u in image_urls if is_valid_image_url(u)))
+    if image_cache is not None:
+        image_urls = [
+            image_url
+            for image_url in image_urls
+            if not (image_cache.lookup(image_cache_key(image_url, preset)) or {}).get(
+                "fresh"
+            )
+        ]
+    if not image_urls:
+        return {}
+
+    prepared = {}
+    transcoded = source_bytes = jpg_bytes = 0
+
+    def download(image_url):
+        try:
+            return image_url, download_image(image_url, image_cache, preset)
+        except Exception as e:
+            logger.warning(f"Skipping image preparation for {image_url}: {e}")
+            return image_url, (None, None)
+
+    transcode = partial(transcode_image, **IMAGE_PRESETS[preset])
+    with ThreadPoolExecutor(
+        max_workers=download_workers
+    ) as downloader, ProcessPoolExecutor(max_workers=max_processes) as transcoder:
+        for start in range(0, len(image_urls), chunk_size):
+            downloaded = {}
+            chunk = image_urls[start : start + chunk_size]
+            for image_url, (jpg_image, response) in downloader.map(download, chunk):
+                if jpg_image is not None and response is None:
+                    prepared[image_url] = jpg_image
+                elif response is not None:
+                    downloaded[image_url] = response
+
+            futures = {
+                image_url: transcoder.submit(transcode, response.content)
+                for image_url, response in downloaded.items()
+            }
+            for image_url, future in futures.items():
+                try:
+                    jpg_image = future.result()
+                except Exception as e:
+                    logger.warning(f"Skipping image preparation for {image_url}: {e}")
+                    continue
+                store_image(
+                    image_cache, image_url, preset, jpg_image, downloaded[image_url]
+                )
+                prepared[image_url] = jpg_image
+                transcoded += 1
+                jpg_bytes += len(jpg_image)
+            source_bytes += sum(len(r.content) for r in downloaded.values())
+
+    logger.info(
+        f"Prepared {len(prepared)} images with preset '{preset}' "
+        f"({transcoded} transcoded, {source_bytes} -> {jpg_bytes} bytes)."
+    )
+    return prepared
@@ -0,0 +1,125 @@
+import logging
+from src.helper_utils import main_logger_name
+
+logger_name = main_logger_name
+logger = logging.getLogger(logger_name)
+
+
+import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+from langdetect import DetectorFactory, detect
+from langdetect.lang_detect_exception import LangDetectException
+
+from src.storage_utils import SqliteCache
+
+SAMPLE_CHARS = 1000  # langdetect is as sure after the first paragraphs
+DETECTION_SEED = 0
+MIN_PARALLEL_TEXTS = 200  # below this the pool start-up costs more than it saves
+
+
+def language_sample(text, sample_chars=SAMPLE_CHARS):
+    """The start of the text, cut at a word boundary."""
+    text = " ".join(str(text).split())
+    if sample_chars is None or len(text) <= sample_chars:
+        return text
+    cut = text[:sample_chars]
+    return cut[: cut.rfind(" ")] if " " in cut else cut
+
+
+def language_cache_key(sample, seed):
+    key = json.dumps([seed, sample])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class LanguageCache(SqliteCache):
+    """On-disk cache of detected languages keyed by language_cache_key.
+
+    Texts that were detected before are not detected again. Undetectable texts
+    are cached as well, with language None."""
+
+    table = "languages"
+    value_column = "language"
+    name = "language cache"
+
+    def __init__(self, path, max_age=90 * 86400):
+        super().__init__(path, max_age)
+
+
+def _seed_detector(seed):
+    # langdetect draws random samples of the text, without a seed the same
+    # text can come out as a different language on the next run
+    DetectorFactory.seed = seed
+
+
+def detect_language(sample):
+    try:
+        return detect(sample)
+    except LangDetectException:  # no letters to detect a language from
+        return None
+
+
+def detect_languages(
+    texts,
+    known_languages=None,
+    sample_chars=SAMPLE_CHARS,
+    seed=DETECTION_SEED,
+    max_workers=None,
+    language_cache=None,
+):
+    """Detects the language of every text, in the order of texts.
+
+    Only the first sample_chars characters are looked at and every distinct
+    sample is detected once, on a process pool of max_workers (None for one
+    per cpu, 1 to stay in process). known_languages gives the language per
+    text where it is already known, those texts are not detected. Empty and
+    undetectable texts get None."""
+    languages = [None] * len(texts)
+    known_count = 0
+    samples = {}  # cache key -> (sample, row positions)
+    for position, text in enumerate(texts):
+        known = known_languages[position] if known_languages is not None else None
+        if isinstance(known, str) and known:
+            languages[position] = known.lower()
+            known_count += 1
+            continue
+        if not isinstance(text, str) or not text.strip():
+            continue
+        sample = language_sample(text, sample_chars)
+        key = language_cache_key(sample, seed)
+        samples.setdefault(key, (sample, []))[1].append(position)
+
+    detected = language_cache.get_many(samples) if language_cache else {}
+    todo = [key for key in samples if key not in detected]
+
+    if todo:
+        todo_samples = [samples[key][0] for key in todo]
+        workers = max_workers or os.cpu_count() or 1
+        if workers == 1 or len(todo) < MIN_PARALLEL_TEXTS:
+            _seed_detector(seed)
+            results = [detect_language(sample) for sample in todo_samples]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_seed_detector,
+                initargs=(seed,),
+            ) as executor:
+                results = list(
+                    executor.map(detect_language, todo_samples, chunksize=64)
+                )
+        new = dict(zip(todo, results))
+        if language_cache:
+            language_cache.put_many(new)
+        detected.update(new)
+
+    for key, (sample, positions) in samples.items():
+        for position in positions:
+            languages[position] = detected[key]
+
+    logger.info(
+        f"Languages of {len(texts)} texts: {known_count} known, "
+        f"{len(todo)} detected, {len(samples) - len(todo)} from cache."
+    )
+    return languages
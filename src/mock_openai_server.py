@@ -0,0 +1,186 @@
+import logging
+from src.helper_utils import main_logger_name
+
+logger_name = main_logger_name
+logger = logging.getLogger(logger_name)
+
+
+import re
+import json
+import time
+import random
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# summaries of different lengths, with the limits used in main (48 to 170
+# characters) the first is too short, the last too long and the rest fit
+DEFAULT_OUTPUTS = [
+    "Meet founders in Berlin.",
+    "Founders and investors meet in Berlin to share what works when scaling a startup.",
+    "Hands-on workshop where developers build their first AI agent together and take home working code.",
+    "An evening of short talks on climate tech, followed by open networking with the speakers and a panel on how to fund sustainable hardware startups in Europe.",
+    "A full day conference on web3 and blockchain with keynotes from industry leaders, practical workshops on smart contracts, a startup pitch competition, networking sessions and an after party with live music.",
+]
+
+
+class MockOpenAIServer:
+    """Local stand-in for the OpenAI chat completions endpoint, for offline
+    runs and benchmarks of the summary stage.
+
+    Routes (relative to url):
+        POST /v1/chat/completions    answers with canned outputs
+
+    Point the client at it with openai.api_base = server.api_base. Every
+    choice is drawn from outputs with a random generator seeded by seed, so
+    a retried prompt can get a different length. Prompts asking for a JSON
+    array (batched prompts) get an array of outputs.
+
+    latency (+ up to jitter) is added to every request. rate_limit_rate and
+    error_rate are the shares of requests answered with a 429 (with a
+    Retry-After header) and with a 500 or 503."""
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        latency=0.0,
+        jitter=0.0,
+        rate_limit_rate=0.0,
+        error_rate=0.0,
+        outputs=None,
+        seed=None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.outputs = list(outputs or DEFAULT_OUTPUTS)
+        self.requests = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_base(self):
+        return f"{self.url}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.debug(f"Mock OpenAI server listening on {self.url}")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _pick(self):
+        with self._lock:
+            return self._random.choice(self.outputs)
+
+    def _completion(self, body):
+        prompt = body["messages"][-1]["content"]
+        count = re.search(r"JSON array of (\d+) strings", prompt)
+        contents = []
+        for index in range(body.get("n", 1)):
+            if count:
+                items = [self._pick() for item in range(int(count.group(1)))]
+                contents.append(json.dumps(items))
+            else:
+                contents.append(self._pick())
+
+        prompt_tokens = len(prompt) // 4 + 1
+        completion_tokens = sum(len(content) // 4 + 1 for content in contents)
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [
+                {
+                    "index": index,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+                for index, content in enumerate(contents)
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, headers=None):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _error(self, status, message, error_type, headers=None):
+                self._send(
+                    status,
+                    {"error": {"message": message, "type": error_type}},
+                    headers,
+                )
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.requests["POST"] += 1
+                    roll = server._random.random()
+                    error_status = server._random.choice((500, 503))
+                    delay = server.latency + server._random.random() * server.jitter
+                if delay:
+                    time.sleep(delay)
+
+                if self.path.rstrip("/") != "/v1/chat/completions":
+                    return self._error(404, "Not Found", "invalid_request_error")
+                if roll < server.rate_limit_rate:
+                    with server._lock:
+                        server.requests["429"] += 1
+                    return self._error(
+                        429,
+                        "Rate limit reached",
+                        "requests",
+                        {"Retry-After": "1"},
+                    )
+                if roll < server.rate_limit_rate + server.error_rate:
+                    with server._lock:
+                        server.requests[str(error_status)] += 1
+                    return self._error(
+                        error_status, "The server had an error", "server_error"
+                    )
+
+                with server._lock:
+                    server.requests["completions"] += body.get("n", 1)
+                self._send(200, server._completion(body))
+
+        return Handler
@@ -0,0 +1,249 @@
+import logging
+from src.helper_utils import main_logger_name
+
+logger_name = main_logger_name
+logger = logging.getLogger(logger_name)
+
+
+import json
+import time
+import random
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class MockXanoServer:
+    """Local stand-in for the Xano API used by xano_scripts, for offline runs
+    and benchmarks. All records live in memory.
+
+    Routes (relative to url):
+        GET    /event                list, paged with ?page=&per_page=
+        GET    /event/{id}           single record
+        POST   /event                create
+        POST   /event/{id}           edit
+        DELETE /event/{id}           delete
+        POST   /event/bulk           {"operations": [...]} -> {"results": [...]}
+        POST   /upload/image         image upload returning file metadata
+
+    latency is added to every request, rate_limit (requests/second) answers
+    with 429 and a Retry-After header once exceeded and error_rate is the
+    share of requests failed with a 503."""
+
+    def __init__(
+        self, host="127.0.0.1", port=0, latency=0.0, rate_limit=None, error_rate=0.0
+    ):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.records = {}
+        self.requests = Counter()
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._window = []
+
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def endpoints(self):
+        """Keyword arguments for send_data_to_xano pointing at this server."""
+        return {
+            "image_endpoint_url": f"{self.url}/upload/image",
+            "send_endpoint_url": f"{self.url}/event",
+            "check_endpoint_url": f"{self.url}/event",
+            "edit_endpoint_url": f"{self.url}/event/{{id}}",
+            "delete_endpoint_url": f"{self.url}/event/{{id}}",
+            "get_endpoint_url": f"{self.url}/event/{{id}}",
+            "bulk_endpoint_url": f"{self.url}/event/bulk",
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.debug(f"Mock Xano server listening on {self.url}")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def add_records(self, records):
+        with self._lock:
+            for record in records:
+                self._create(record)
+
+    # record operations, called with the lock held
+    def _create(self, data):
+        record = {
+            k: v
+            for k, v in data.items()
+            if not k.endswith("_id") or k == "bookmark_users_id"
+        }
+        record["id"] = self._next_id
+        record.setdefault("bookmark_users_id", [])
+        self._next_id += 1
+        self.records[record["id"]] = record
+        return 200, record
+
+    def _edit(self, record_id, data):
+        if record_id not in self.records:
+            return 404, {"message": "Not Found"}
+        record = {
+            k: v
+            for k, v in data.items()
+            if not k.endswith("_id") or k == "bookmark_users_id"
+        }
+        record["id"] = record_id
+        self.records[record_id] = record
+        return 200, record
+
+    def _delete(self, record_id):
+        if self.records.pop(record_id, None) is None:
+            return 404, {"message": "Not Found"}
+        return 200, None
+
+    def _apply(self, operation):
+        if operation["op"] == "create":
+            return self._create(operation["data"])
+        if operation["op"] == "edit":
+            return self._edit(int(operation["id"]), operation["data"])
+        if operation["op"] == "delete":
+            return self._delete(int(operation["id"]))
+        return 400, {"message": f"Unknown op {operation['op']}"}
+
+    def _throttled(self):
+        if not self.rate_limit:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            self._window = [t for t in self._window if now - t < 1]
+            if len(self._window) >= self.rate_limit:
+                self.requests["429"] += 1
+                return True
+            self._window.append(now)
+            return False
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, headers=None):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                return json.loads(raw) if raw else {}
+
+            def _route(self, method):
+                parsed = urlparse(self.path)
+                parts = [p for p in parsed.path.split("/") if p]
+                body = self._body()  # always read so keep-alive connections stay usable
+                with server._lock:
+                    server.requests[method] += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                if server._throttled():
+                    return self._send(
+                        429, {"message": "Too Many Requests"}, {"Retry-After": "1"}
+                    )
+                if server.error_rate and random.random() < server.error_rate:
+                    with server._lock:
+                        server.requests["503"] += 1
+                    return self._send(503, {"message": "Service Unavailable"})
+
+                if parts == ["upload", "image"] and method == "POST":
+                    content = body.get("content", "")
+                    return self._send(
+                        200,
+                        {
+                            "path": f"/vault/mock/{abs(hash(content))}.jpg",
+                            "name": "image.jpg",
+                            "type": "image",
+                            "size": len(content),
+                            "mime": "image/jpeg",
+                            "meta": {},
+                        },
+                    )
+                if not parts or parts[0] != "event":
+                    return self._send(404, {"message": "Not Found"})
+
+                with server._lock:
+                    if parts == ["event", "bulk"] and method == "POST":
+                        server.requests["bulk_items"] += len(body["operations"])
+                        results = []
+                        for operation in body["operations"]:
+                            status, result = server._apply(operation)
+                            results.append({"status": status, "body": result})
+                        return self._send(200, {"results": results})
+
+                    if len(parts) == 1 and method == "GET":
+                        records = sorted(server.records.values(), key=lambda r: r["id"])
+                        query = parse_qs(parsed.query)
+                        if "page" not in query:
+                            return self._send(200, records)
+                        page = int(query["page"][0])
+                        per_page = int(query.get("per_page", [len(records) or 1])[0])
+                        items = records[(page - 1) * per_page : page * per_page]
+                        has_next = page * per_page < len(records)
+                        return self._send(
+                            200,
+                            {
+                                "itemsReceived": len(items),
+                                "curPage": page,
+                                "nextPage": page + 1 if has_next else None,
+                                "prevPage": page - 1 if page > 1 else None,
+                                "items": items,
+                            },
+                        )
+                    if len(parts) == 1 and method == "POST":
+                        return self._send(
+                            *server._apply({"op": "create", "data": body})
+                        )
+
+                    record_id = int(parts[1])
+                    if method == "GET":
+                        if record_id not in server.records:
+                            return self._send(404, {"message": "Not Found"})
+                        return self._send(200, server.records[record_id])
+                    if method == "POST":
+                        return self._send(
+                            *server._apply(
+                                {"op": "edit", "id": record_id, "data": body}
+                            )
+                        )
+                    return self._send(*server._apply({"op": "delete", "id": record_id}))
+
+            def do_GET(self):
+                self._route("GET")
+
+            def do_POST(self):
+                self._route("POST")
+
+            def do_DELETE(self):
+                self._route("DELETE")
+
+        return Handler
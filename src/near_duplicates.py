@@ -0,0 +1,179 @@
+import logging
+from src.helper_utils import main_logger_name
+
+logger_name = main_logger_name
+logger = logging.getLogger(logger_name)
+
+
+import re
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from src.date_utils import parse_dates
+from src.data_utils import merge_values_per_key
+
+SHINGLE_WORDS = 3
+MAX_HASH = 2**32 - 1
+
+_words = re.compile(r"\w+")
+
+
+def shingle_hashes(text, word_hashes, shingle_words=SHINGLE_WORDS):
+    """32 bit hashes of the word shingles of the text. word_hashes caches the
+    hash of every word seen, so each word is hashed once per run."""
+    words = _words.findall(text.lower())
+    for word in set(words).difference(word_hashes):
+        word_hashes[word] = zlib.crc32(word.encode("utf-8"))
+    hashes = np.fromiter(map(word_hashes.__getitem__, words), np.uint64, len(words))
+    if len(hashes) <= shingle_words:
+        return np.unique(hashes)
+    # combines the hashes of consecutive words into one per shingle
+    shingles = hashes[: len(hashes) - shingle_words + 1].copy()
+    for offset in range(1, shingle_words):
+        shingles = (shingles * np.uint64(31) + hashes[offset:][: len(shingles)]) & (
+            np.uint64(MAX_HASH)
+        )
+    return np.unique(shingles)
+
+
+class MinHasher:
+    """MinHash signatures of num_perm multiply-shift hashes, the upper 32 bits
+    of (a * x + b) mod 2**64 with a random odd a, which needs no modulo."""
+
+    def __init__(self, num_perm=128, seed=0):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(0, 2**64, num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2**64, num_perm, dtype=np.uint64)
+
+    def signature(self, shingles):
+        hashed = self.a[:, None] * shingles[None, :] + self.b[:, None]
+        return (hashed >> np.uint64(32)).min(axis=1).astype(np.uint32)
+
+
+class UnionFind:
+    def __init__(self, size):
+        self.parent = np.arange(size)
+
+    def find(self, item):
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, first, second):
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            # the earlier row stays the root so it is the one that is kept
+            self.parent[max(first, second)] = min(first, second)
+
+
+def candidate_pairs(band_keys):
+    """Pairs of positions sharing a band key, each paired with the first
+    position of its key, which is enough as the other bands link the rest."""
+    pairs = []
+    positions = np.arange(len(band_keys))
+    for keys in band_keys.T:
+        first = pd.Series(positions).groupby(keys, sort=False).transform("first")
+        first = first.to_numpy()
+        linked = first != positions
+        pairs.append(np.stack([first[linked], positions[linked]], axis=1))
+    return np.unique(np.concatenate(pairs), axis=0)
+
+
+def near_duplicate_groups(texts, days, threshold=0.7, num_perm=128, bands=32, seed=0):
+    """Group id per text, the position of the first text of its group.
+
+    Texts are compared by MinHash/LSH: every signature is cut into bands and
+    only texts of the same day sharing a band are candidates, which keeps the
+    work near linear. A candidate joins the group when the share of equal
+    signature values (the estimated Jaccard similarity of the word shingles)
+    is at least threshold. Empty texts are never grouped."""
+    if num_perm % bands:
+        raise ValueError("num_perm must be divisible by bands")
+
+    minhasher = MinHasher(num_perm, seed)
+    word_hashes = {}
+    signatures = np.zeros((len(texts), num_perm), dtype=np.uint32)
+    has_text = np.zeros(len(texts), dtype=bool)
+    for position, text in enumerate(texts):
+        shingles = shingle_hashes(text, word_hashes)
+        if len(shingles):
+            signatures[position] = minhasher.signature(shingles)
+            has_text[position] = True
+
+    # one key per band and row, combining the band of the signature and the day
+    band_keys = np.column_stack(
+        [
+            pd.util.hash_array(days.astype(np.int64))
+            ^ pd.util.hash_pandas_object(pd.DataFrame(band), index=False).to_numpy()
+            for band in np.split(signatures, bands, axis=1)
+        ]
+    )
+    # rows without text get unique keys so they are never candidates
+    band_keys[~has_text] = np.arange((~has_text).sum(), dtype=np.uint64)[:, None]
+
+    groups = UnionFind(len(texts))
+    if len(texts) > 1:
+        pairs = candidate_pairs(band_keys)
+        similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+        for first, second in pairs[similarity >= threshold]:
+            groups.union(first, second)
+
+    return np.array([groups.find(position) for position in range(len(texts))])
+
+
+def merge_near_duplicates(
+    data,
+    columns=("Name", "Long_Description"),
+    merge_columns=("Keyword", "Source"),
+    threshold=0.7,
+    num_perm=128,
+    bands=32,
+    seed=0,
+):
+    """Removes events that are posted more than once with slightly different
+    text, e.g. on Meetup and Eventbrite. Rows are near duplicates when they
+    are on the same day and their joined columns are similar enough (see
+    near_duplicate_groups). The first row of every group is kept with the
+    merge_columns values of the whole group."""
+    texts = data[columns[0]].fillna("").astype(str)
+    for column in columns[1:]:
+        texts = texts + " " + data[column].fillna("").astype(str)
+    if "Date" in data.columns:
+        sources = data["Source"] if "Source" in data.columns else None
+        days = parse_dates(data["Date"], sources=sources, errors="coerce")
+        # undated rows share one bucket (NaT becomes the smallest int64)
+        days = days.dt.normalize().to_numpy().astype("int64")
+    else:
+        days = np.zeros(len(data), dtype=np.int64)
+
+    groups = near_duplicate_groups(
+        texts.to_list(), days, threshold, num_perm, bands, seed
+    )
+    first = groups == np.arange(len(groups))
+    if first.all():
+        logger.info("No near duplicates found.")
+        return data
+
+    df_no_duplicates = data[first].copy()
+    for column in merge_columns:
+        if column in data.columns:
+            df_no_duplicates[column] = merge_values_per_key(
+                data[column], groups, groups[first], df_no_duplicates[column]
+            )
+
+    if "Link" in data.columns:
+        links = data["Link"].to_numpy()
+        for position in np.flatnonzero(~first):
+            logger.debug(
+                f"Near duplicate {links[position]} merged into {links[groups[position]]}"
+            )
+    logger.info(
+        f"Merged {int((~first).sum())} near duplicates into "
+        f"{len(np.unique(groups[~first]))} events."
+    )
+    return df_no_duplicates
@@ -6,40 +6,125 @@ logger = logging.getLogger(logger_name)
 
 
 import time
+import json
 import requests
 import pandas as pd
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 
 import openai
 
+from src.token_bucket import get_bucket, OPENAI, OPENAI_TOKENS
+from src.summary_cache import summary_cache_key
+from src.summary_checkpoint import SummaryCheckpoint
+from src.text_utils import count_tokens, prepare_input_text, log_tokens_saved
+
+OPENAI_MODEL = "gpt-3.5-turbo"
+
+# tokens reserved for the answer on top of the prompt, a summary is far shorter
+OUTPUT_TOKEN_ALLOWANCE = 256
+
+# requests per row before a summary outside the char limits is trimmed locally
+DEFAULT_MAX_ATTEMPTS = 3
+
+# appended to the prompt when several descriptions are sent in one request
+BATCH_INSTRUCTIONS = (
+    "\n\nDo this for each of the {count} event descriptions below. Answer only "
+    "with a JSON array of {count} strings holding the summaries in the order "
+    "of the descriptions.\n\n"
+)
+
 
 def call_openai(api_key, prompt, input_text):
+    # Concatenate the prompt and input input_text
+    full_prompt = prompt + str(input_text)
+    output_texts = request_completion(api_key, full_prompt)
+    return output_texts[0] if output_texts else None
+
+
+def call_openai_candidates(api_key, prompt, input_text, candidates):
+    """Returns `candidates` alternative summaries generated by one request."""
+    full_prompt = prompt + str(input_text)
+    return request_completion(api_key, full_prompt, candidates=candidates) or []
+
+
+def call_openai_batch(api_key, prompt, input_texts):
+    """Summarizes several input texts with one request. Returns one summary per
+    input text, None for every item the answer did not contain."""
+    full_prompt = (
+        prompt
+        + BATCH_INSTRUCTIONS.format(count=len(input_texts))
+        + "\n\n".join(
+            f"Description {n}:\n{input_text}"
+            for n, input_text in enumerate(input_texts, start=1)
+        )
+    )
+    output_texts = request_completion(
+        api_key, full_prompt, OUTPUT_TOKEN_ALLOWANCE * len(input_texts)
+    )
+    if not output_texts:
+        return [None] * len(input_texts)
+    return parse_summary_array(output_texts[0], len(input_texts))
+
+
+def parse_summary_array(output_text, count):
+    # the model sometimes wraps the array in a code block or a sentence
+    start, end = output_text.find("["), output_text.rfind("]")
+    try:
+        items = json.loads(output_text[start : end + 1])
+    except ValueError:
+        logger.warning("Batch answer is not a JSON array.")
+        return [None] * count
+    if not isinstance(items, list) or len(items) != count:
+        logger.warning(f"Batch answer does not hold {count} summaries.")
+        return [None] * count
+    return [item if isinstance(item, str) else None for item in items]
+
+
+def request_completion(
+    api_key, full_prompt, output_tokens=OUTPUT_TOKEN_ALLOWANCE, candidates=1
+):
+    """Returns the texts of all choices of the completion, None once every
+    attempt failed. candidates > 1 asks for that many choices (n)."""
     # Set your OpenAI API key
     openai.api_key = api_key
 
-    # Concatenate the prompt and input input_text
-    full_prompt = prompt + str(input_text)
+    reserved_tokens = count_tokens(full_prompt) + output_tokens * candidates
 
     attempts = 0
     while attempts < 5:
         try:
+            # both the requests per minute and the tokens per minute are limited
+            get_bucket(OPENAI).acquire()
+            get_bucket(OPENAI_TOKENS).acquire(reserved_tokens)
+
             # Send the request to the OpenAI API
             response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
+                model=OPENAI_MODEL,
                 messages=[
                     {"role": "system", "content": "You are a helpful assistant."},
                     {"role": "user", "content": full_prompt},
                 ],
+                n=candidates,
             )
 
-            # Extract the generated summary from the API response
-            output_text = response.choices[0].message.content
+            # usage above the reservation is taken from the following calls
+            used_tokens = response.get("usage", {}).get("total_tokens", 0)
+            if used_tokens > reserved_tokens:
+                get_bucket(OPENAI_TOKENS).consume(used_tokens - reserved_tokens)
 
-            # print(f"\n{output_text}")
+            # Extract the generated summaries from the API response
+            output_texts = [choice.message.content for choice in response.choices]
 
-            # Remove non-ASCII characters from the output_text
-            output_text = output_text.encode("ascii", "ignore").decode()
+            # print(f"\n{output_texts}")
 
-            return output_text
+            # Remove non-ASCII characters from the output_texts
+            output_texts = [
+                output_text.encode("ascii", "ignore").decode()
+                for output_text in output_texts
+            ]
+
+            return output_texts
 
         except (
             openai.error.RateLimitError,
@@ -56,6 +141,177 @@ def call_openai(api_key, prompt, input_text):
             attempts += 1
 
 
+def summarize_text(
+    api_key,
+    prompt,
+    input_text,
+    index,
+    char_max,
+    char_min,
+    to_remove,
+    summary_cache=None,
+    candidates=1,
+    max_attempts=DEFAULT_MAX_ATTEMPTS,
+):
+    """Summarizes one input text within char_min and char_max. candidates > 1
+    asks for several summaries per request and keeps the one that fits best.
+    After max_attempts requests the best output is trimmed locally with
+    trim_to_limits."""
+    if summary_cache is not None:
+        cache_key = summary_cache_key(
+            OPENAI_MODEL, prompt, input_text, char_max, char_min, to_remove
+        )
+        cached = summary_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    api_output = generate_summary(
+        api_key, prompt, input_text, char_max, char_min, candidates
+    )
+    attempts = 1
+    max_attempts = max_attempts or DEFAULT_MAX_ATTEMPTS
+
+    while not within_limits(api_output, char_max, char_min):
+        if attempts >= max_attempts:
+            logger.warning(
+                f"Output length still not within limits {char_min} and {char_max} with {len(api_output)} characters at row {index} after {attempts} attempts. Trimming it..."
+            )
+            api_output = trim_to_limits(api_output, char_max, char_min)
+            break
+        logger.warning(
+            f"Output length not within limits {char_min} and {char_max} with {len(api_output)} characters at row {index}. Trying again..."
+        )
+        time.sleep(0.5)
+        api_output = generate_summary(
+            api_key, prompt, input_text, char_max, char_min, candidates
+        )
+        attempts += 1
+
+        logger.info(f"Retry: | Index: {index} | {api_output}")
+
+    api_output = remove_strings(api_output, to_remove)
+
+    if summary_cache is not None:
+        summary_cache.put(cache_key, api_output)
+    return api_output
+
+
+def summarize_batch(
+    api_key,
+    prompt,
+    input_texts,
+    indices,
+    char_max,
+    char_min,
+    to_remove,
+    summary_cache=None,
+    candidates=1,
+    max_attempts=DEFAULT_MAX_ATTEMPTS,
+):
+    """Summarizes the input texts in one request. Items missing from the answer
+    or outside the char limits are summarized on their own by summarize_text."""
+    cache_keys = [
+        summary_cache_key(
+            OPENAI_MODEL, prompt, input_text, char_max, char_min, to_remove
+        )
+        for input_text in input_texts
+    ]
+    summaries = [None] * len(input_texts)
+    if summary_cache is not None:
+        summaries = [summary_cache.get(cache_key) for cache_key in cache_keys]
+
+    missing = [j for j, summary in enumerate(summaries) if summary is None]
+    if not missing:
+        return summaries
+    api_outputs = call_openai_batch(api_key, prompt, [input_texts[j] for j in missing])
+    for j, api_output in zip(missing, api_outputs):
+        if api_output is None or not within_limits(api_output, char_max, char_min):
+            logger.warning(
+                f"Batch item at row {indices[j]} missing or not within limits {char_min} and {char_max}. Summarizing it on its own..."
+            )
+            api_output = summarize_text(
+                api_key,
+                prompt,
+                input_texts[j],
+                indices[j],
+                char_max,
+                char_min,
+                None,
+                candidates=candidates,
+                max_attempts=max_attempts,
+            )
+        summaries[j] = remove_strings(api_output, to_remove)
+        if summary_cache is not None:
+            summary_cache.put(cache_keys[j], summaries[j])
+    return summaries
+
+
+def generate_summary(api_key, prompt, input_text, char_max, char_min, candidates=1):
+    if candidates > 1:
+        api_outputs = call_openai_candidates(api_key, prompt, input_text, candidates)
+        return best_candidate(api_outputs, char_max, char_min)
+    return call_openai(api_key, prompt, input_text)
+
+
+def best_candidate(api_outputs, char_max, char_min):
+    """The longest candidate within the limits, otherwise the shortest too long
+    one as it can still be trimmed, otherwise the longest too short one."""
+
+    def distance(api_output):
+        if char_max and len(api_output) > char_max:
+            return (1, len(api_output) - char_max)
+        if char_min and len(api_output) < char_min:
+            return (2, char_min - len(api_output))
+        return (0, -len(api_output))
+
+    return min(api_outputs, key=distance) if api_outputs else None
+
+
+def trim_to_limits(api_output, char_max, char_min=None):
+    """Cuts a too long summary at the last sentence end within char_max, or at
+    the last word boundary when that sentence cut would be shorter than
+    char_min (e.g. a cut after "Dr."). The same input always gives the same
+    output."""
+    if not char_max or len(api_output) <= char_max:
+        return api_output
+    cut = api_output[:char_max]
+    sentence_end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "))
+    if cut[-1] in ".!?" and api_output[char_max : char_max + 1] in ("", " "):
+        sentence_end = len(cut) - 1
+    if sentence_end > 0 and sentence_end + 1 >= (char_min or 0):
+        return cut[: sentence_end + 1]
+    word_end = cut.rfind(" ")
+    if word_end > 0:
+        cut = cut[:word_end]
+    cut = cut.rstrip(" ,;:-")
+    return cut if len(cut) >= char_max else cut + "."
+
+
+def within_limits(api_output, char_max, char_min):
+    return not (
+        (char_max and len(api_output) > char_max)
+        or (char_min and len(api_output) < char_min)
+    )
+
+
+def remove_strings(api_output, to_remove):
+    if to_remove is not None:
+        for string in to_remove:
+            api_output = api_output.replace(string, "")
+    return api_output
+
+
+def checkpoint_summaries(checkpoint, keys, batch, future):
+    # done callback, failed futures are left for the next run
+    if future.cancelled() or future.exception() is not None:
+        return
+    summaries = future.result()
+    if not isinstance(summaries, list):
+        summaries = [summaries]
+    for i, summary in zip(batch, summaries):
+        checkpoint.append(keys[i], i, summary)
+
+
 def openai_loop_over_column_and_add(
     api_key,
     prompt,
@@ -66,7 +322,30 @@ def openai_loop_over_column_and_add(
     char_max=None,
     char_min=None,
     to_remove=None,
+    max_workers=1,
+    summary_cache=None,
+    batch_size=1,
+    candidates=1,
+    max_attempts=DEFAULT_MAX_ATTEMPTS,
+    prepare_input=False,
+    max_input_tokens=None,
+    checkpoint_path=None,
+    skip_existing=False,
 ):
+    """Summarizes column_for_input of every row into column_for_output.
+
+    max_workers rows are summarized concurrently, which also bounds the
+    requests in flight; the OPENAI and OPENAI_TOKENS buckets keep them within
+    the requests and tokens per minute. Results are written back to their
+    own rows in row order. With a summary_cache, rows whose input text was
+    summarized before with the same model, prompt and limits cost no call.
+    batch_size > 1 packs that many descriptions into one request. candidates
+    and max_attempts bound the length retries per row, see summarize_text.
+    prepare_input strips HTML, boilerplate and repeated paragraphs from the
+    inputs and trims them to max_input_tokens before anything is sent. With a
+    checkpoint_path every summary is persisted as soon as it returns and a
+    rerun after a crash resumes from there, see SummaryCheckpoint.
+    skip_existing keeps the rows that already hold a column_for_output value."""
     if char_max is not None and char_min is None:
         char_min = int(0.4 * char_max)
 
@@ -77,26 +356,118 @@ def openai_loop_over_column_and_add(
     elif isinstance(data, list):
         data = [{"data": item} for item in data]
 
-    for i, row in enumerate(data):
-        api_output = call_openai(api_key, prompt, row[column_for_input])
+    # rows that already hold a summary, e.g. from reuse_existing_summaries
+    resumed = {}
+    if skip_existing:
+        resumed = {
+            i: row[column_for_output]
+            for i, row in enumerate(data)
+            if isinstance(row.get(column_for_output), str) and row[column_for_output]
+        }
 
-        while (char_max and len(api_output) > char_max) or (
-            char_min and len(api_output) < char_min
-        ):
-            logger.warning(
-                f"Output length not within limits {char_min} and {char_max} with {len(api_output)} characters at row {i}. Trying again..."
-            )
-            time.sleep(0.5)
-            api_output = call_openai(api_key, prompt, row[column_for_input])
+    input_texts = [row[column_for_input] for row in data]
+    token_counts = {}
+    if prepare_input:
+        for i in range(len(data)):
+            if i not in resumed:
+                input_texts[i], *token_counts[i] = prepare_input_text(
+                    input_texts[i], max_input_tokens
+                )
+
+    # rows finished by a crashed run come from the checkpoint
+    checkpoint = SummaryCheckpoint(checkpoint_path) if checkpoint_path else None
+    keys = [
+        summary_cache_key(
+            OPENAI_MODEL, prompt, input_text, char_max, char_min, to_remove
+        )
+        for input_text in input_texts
+    ]
+    if checkpoint is not None:
+        resumed.update(
+            {
+                i: checkpoint.get(key)
+                for i, key in enumerate(keys)
+                if i not in resumed and checkpoint.get(key) is not None
+            }
+        )
+    todo = [i for i in range(len(data)) if i not in resumed]
+    if prepare_input:
+        # only the rows that are sent count, resumed rows cost no tokens
+        log_tokens_saved(
+            sum(token_counts[i][0] for i in todo),
+            sum(token_counts[i][1] for i in todo),
+        )
 
-            logger.info(f"Retry: | Index: {i} | {api_output}")
+    batch_size = max(1, batch_size)
+    batches = [
+        todo[start : start + batch_size] for start in range(0, len(todo), batch_size)
+    ]
 
-        if to_remove is not None:
-            for string in to_remove:
-                api_output = api_output.replace(string, "")
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            if batch_size == 1:
+                futures = [
+                    executor.submit(
+                        summarize_text,
+                        api_key,
+                        prompt,
+                        input_texts[i],
+                        i,
+                        char_max,
+                        char_min,
+                        to_remove,
+                        summary_cache,
+                        candidates,
+                        max_attempts,
+                    )
+                    for (i,) in batches
+                ]
+            else:
+                futures = [
+                    executor.submit(
+                        summarize_batch,
+                        api_key,
+                        prompt,
+                        [input_texts[i] for i in batch],
+                        batch,
+                        char_max,
+                        char_min,
+                        to_remove,
+                        summary_cache,
+                        candidates,
+                        max_attempts,
+                    )
+                    for batch in batches
+                ]
+            if checkpoint is not None:
+                for batch, future in zip(batches, futures):
+                    future.add_done_callback(
+                        partial(checkpoint_summaries, checkpoint, keys, batch)
+                    )
 
-        row[column_for_output] = api_output
-        logger.info(f"Event: {i + 1} | Index: {i} | {row[column_for_output]}")
+            positions = {
+                i: (future, position)
+                for batch, future in zip(batches, futures)
+                for position, i in enumerate(batch)
+            }
+            for i, row in enumerate(data):
+                if i in resumed:
+                    summary = resumed[i]
+                else:
+                    future, position = positions[i]
+                    summary = future.result()
+                    if batch_size > 1:
+                        summary = summary[position]
+                row[column_for_output] = summary
+                logger.info(f"Event: {i + 1} | Index: {i} | {row[column_for_output]}")
+    except BaseException:
+        if checkpoint is not None:
+            checkpoint.close()
+        raise
+    if checkpoint is not None:
+        checkpoint.close(finished=True)
+    if summary_cache is not None:
+        summary_cache.log_stats()
 
     if path_to_file is not None:
         path_to_file = (
@@ -0,0 +1,168 @@
+import logging
+from src.helper_utils import main_logger_name
+
+logger_name = main_logger_name
+logger = logging.getLogger(logger_name)
+
+
+import re
+import time
+import random
+import threading
+from collections import deque
+from urllib.parse import urlparse
+
+# status codes worth another attempt, every other error status fails right away
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+# answers after which a request may or may not have been applied
+UNCERTAIN_STATUS_CODES = {504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to an endpoint that keeps failing."""
+
+
+class DeadlineExceededError(Exception):
+    """Raised when the retry budget of the request or of the run is used up."""
+
+
+class UncertainOutcomeError(Exception):
+    """Raised instead of resending a request that must not be applied twice (a
+    create) when it may already have reached the server, e.g. on a read timeout."""
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        max_attempts=6,
+        base_delay=1.0,
+        max_delay=30.0,
+        request_deadline=120.0,
+        run_deadline=None,
+        timeout=30.0,
+    ):
+        """Delays grow as base_delay * 2^attempt capped at max_delay with full
+        jitter. request_deadline bounds the time spent on one request including
+        its retries, run_deadline the time spent on all requests of a run.
+        timeout is passed to requests for every single attempt."""
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.request_deadline = request_deadline
+        self.run_deadline = run_deadline
+        self.timeout = timeout
+        self.run_started = time.monotonic()
+
+    def start_run(self):
+        self.run_started = time.monotonic()
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def run_time_left(self):
+        if self.run_deadline is None:
+            return float("inf")
+        return self.run_deadline - (time.monotonic() - self.run_started)
+
+    def check_run_deadline(self):
+        if self.run_time_left() <= 0:
+            raise DeadlineExceededError(
+                f"Run deadline of {self.run_deadline} seconds exceeded"
+            )
+
+
+class CircuitBreaker:
+    def __init__(self, name, window=20, failure_ratio=0.5, min_calls=5, cooldown=60):
+        """Opens once at least min_calls of the last `window` calls were made and
+        failure_ratio of them failed. While open every call fails fast; after
+        cooldown seconds one trial call is let through (half open) and its
+        outcome closes or reopens the circuit."""
+        self.name = name
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self._results = deque(maxlen=window)
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def before_request(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if (
+                time.monotonic() - self._opened_at < self.cooldown
+                or self._trial_running
+            ):
+                raise CircuitOpenError(f"Circuit for {self.name} is open")
+            self._trial_running = True
+
+    def release_trial(self):
+        """Lets the next call try again after a trial call that ended with
+        neither a success nor a failure, e.g. an unexpected exception."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self._results.append(True)
+            if self._opened_at is not None:
+                logger.info(f"Circuit for {self.name} closed again.")
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._results.append(False)
+            self._trial_running = False
+            failures = self._results.count(False)
+            if self._opened_at is not None:
+                self._opened_at = time.monotonic()  # failed trial, wait again
+            elif (
+                len(self._results) >= self.min_calls
+                and failures / len(self._results) >= self.failure_ratio
+            ):
+                self._opened_at = time.monotonic()
+                logger.error(
+                    f"Circuit for {self.name} opened after {failures} failures in "
+                    f"the last {len(self._results)} calls."
+                )
+
+
+_retry_policy = RetryPolicy()
+_breaker_settings = {}
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def configure_retry_policy(retry_policy=None, circuit_breaker=None):
+    """Applies the RETRY_POLICY and CIRCUIT_BREAKER settings entries."""
+    global _retry_policy
+    _retry_policy = RetryPolicy(**(retry_policy or {}))
+    with _breakers_lock:
+        _breaker_settings.clear()
+        _breaker_settings.update(circuit_breaker or {})
+        _breakers.clear()
+
+
+def get_retry_policy():
+    return _retry_policy
+
+
+def endpoint_name(method, url):
+    # record ids are replaced so all calls to one endpoint share a breaker
+    parsed = urlparse(url)
+    path = re.sub(r"/\d+(?=/|$)", "/{id}", parsed.path)
+    return f"{method} {parsed.netloc}{path}"
+
+
+def get_circuit_breaker(name):
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, **_breaker_settings)
+        return _breakers[name]
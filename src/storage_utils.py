@@ -0,0 +1,147 @@
+import logging
+from src.helper_utils import main_logger_name
+
+logger_name = main_logger_name
+logger = logging.getLogger(logger_name)
+
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+
+class AppendOnlyLog:
+    """JSON lines file a run appends its progress to, so a rerun after a crash
+    can resume from it.
+
+    Every record is flushed and fsynced as it is written. Opening an existing
+    file passes its records to replay, which subclasses implement, skipping a
+    last line that was torn by the crash."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.resumed = self.path.exists()
+
+        torn = False
+        if self.resumed:
+            with open(self.path, "r", encoding="utf-8") as file:
+                for line in file:
+                    torn = not line.endswith("\n")
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.replay(record)
+
+        self._file = open(self.path, "a", encoding="utf-8")
+        if torn:  # the next record must not be appended to the torn line
+            self._file.write("\n")
+
+    def replay(self, record):
+        raise NotImplementedError
+
+    def write(self, record):
+        with self._lock:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def truncate(self):
+        """Drops every record written so far."""
+        with self._lock:
+            self._file.truncate(0)
+        self.resumed = False
+
+    def close(self, finished=False):
+        """Closes the file. finished=True removes it as the run completed and
+        there is nothing left to resume."""
+        with self._lock:
+            self._file.close()
+        if finished:
+            self.path.unlink(missing_ok=True)
+
+
+class SqliteCache:
+    """On-disk key-value cache in an SQLite table, shared by the threads of a
+    run. Subclasses name the table and its value column.
+
+    Entries that were not used for max_age seconds are evicted when the cache
+    is opened."""
+
+    table = None
+    value_column = None
+    name = None  # used in the log lines
+
+    def __init__(self, path, max_age):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, "
+                f"{self.value_column} TEXT, last_access REAL)"
+            )
+        self.evict()
+
+    def get(self, key):
+        """Returns the value of the key, None when it is not cached."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        """Returns {key: value} for the keys in the cache."""
+        found = {}
+        keys = list(keys)
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, {self.value_column} FROM {self.table} WHERE key IN "
+                    f"({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                found.update(rows)
+            with self._db:
+                self._db.executemany(
+                    f"UPDATE {self.table} SET last_access = ? WHERE key = ?",
+                    [(time.time(), key) for key in found],
+                )
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put(self, key, value):
+        self.put_many({key: value})
+
+    def put_many(self, values):
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO {self.table} "
+                f"(key, {self.value_column}, last_access) VALUES (?, ?, ?)",
+                [(key, value, now) for key, value in values.items()],
+            )
+
+    def evict(self):
+        """Deletes the entries that were not used within max_age."""
+        with self._lock, self._db:
+            evicted = self._db.execute(
+                f"DELETE FROM {self.table} WHERE last_access < ?",
+                (time.time() - self.max_age,),
+            ).rowcount
+        if evicted:
+            logger.debug(f"Evicted {evicted} {self.table} from the {self.name}.")
+
+    def log_stats(self):
+        logger.info(
+            f"{self.name.capitalize()}: {self.hits} hits, {self.misses} misses."
+        )
@@ -0,0 +1,32 @@
+import logging
+from src.helper_utils import main_logger_name
+
+logger_name = main_logger_name
+logger = logging.getLogger(logger_name)
+
+
+import json
+import hashlib
+
+from src.storage_utils import SqliteCache
+
+
+def summary_cache_key(model, prompt, input_text, char_max, char_min, to_remove):
+    """Hash of everything that decides the final summary of an input text."""
+    key = json.dumps(
+        [model, prompt, char_max, char_min, list(to_remove or []), str(input_text)]
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class SummaryCache(SqliteCache):
+    """On-disk cache of finished summaries keyed by summary_cache_key.
+
+    Unchanged input texts get their summary from here without an API call."""
+
+    table = "summaries"
+    value_column = "summary"
+    name = "summary cache"
+
+    def __init__(self, path, max_age=30 * 86400):
+        super().__init__(path, max_age)
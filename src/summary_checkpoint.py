@@ -0,0 +1,36 @@
+import logging
+from src.helper_utils import main_logger_name
+
+logger_name = main_logger_name
+logger = logging.getLogger(logger_name)
+
+
+from src.storage_utils import AppendOnlyLog
+
+
+class SummaryCheckpoint(AppendOnlyLog):
+    """Append-only checkpoint of the summaries of a run of the OpenAI stage.
+
+    Every summary is written as soon as it returns, keyed by its
+    summary_cache_key. A run that crashes leaves the file behind and the next
+    run takes the summaries from it instead of paying for them again. The
+    checkpoint is removed after a complete run."""
+
+    def __init__(self, path):
+        self.summaries = {}
+        super().__init__(path)
+        if self.resumed:
+            logger.info(
+                f"Resuming summary checkpoint {self.path.name} with "
+                f"{len(self.summaries)} summaries."
+            )
+
+    def replay(self, record):
+        self.summaries[record["key"]] = record["summary"]
+
+    def get(self, key):
+        return self.summaries.get(key)
+
+    def append(self, key, index, summary):
+        self.summaries[key] = summary
+        self.write({"key": key, "index": index, "summary": summary})
@@ -0,0 +1,97 @@
+import logging
+from src.helper_utils import main_logger_name
+
+logger_name = main_logger_name
+logger = logging.getLogger(logger_name)
+
+
+import json
+import time
+import hashlib
+
+from src.storage_utils import AppendOnlyLog
+
+
+def operation_token(link, action, fingerprint=None):
+    """Token of a planned operation. Creates are keyed by Link only, so a create
+    the snapshot does not show yet is not sent again. Every other action is
+    keyed by the fingerprint it writes as well, so a later change of the same
+    Link is new work and not taken for the operation done before."""
+    key = f"{link}|{action}"
+    if action != "create":
+        key += f"|{fingerprint}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def sync_run_id(links, fingerprints):
+    """Id of a sync run over the incoming rows. A rerun over the same rows gets
+    the same id, a journal left by a run over other rows is not resumed."""
+    rows = sorted(zip(map(str, links), map(str, fingerprints)))
+    return hashlib.sha1(json.dumps(rows).encode("utf-8")).hexdigest()
+
+
+class SyncJournal(AppendOnlyLog):
+    """Append-only journal of the operations sent to Xano during a sync.
+
+    Every operation is written as "started" before it is sent and as "done"
+    once its response arrived. A run that crashes leaves the journal behind,
+    the next run skips the operations that are already done and reconciles
+    the creates that were started without a response against the snapshot by
+    Link. The journal is removed after a complete run.
+
+    The first line holds the run_id of the run (see sync_run_id), a journal
+    of another run is discarded instead of resumed."""
+
+    def __init__(self, path, run_id=None):
+        self.run_id = run_id
+        self.journal_run_id = None
+        self.done = {}
+        self.pending = {}
+        super().__init__(path)
+
+        if self.resumed and self.journal_run_id != run_id:
+            logger.warning(
+                f"Sync journal {self.path.name} is from a run over other rows, "
+                f"starting a new one."
+            )
+            self.truncate()
+            self.done = {}
+            self.pending = {}
+        if self.resumed:
+            logger.info(
+                f"Resuming sync journal {self.path.name}: {len(self.done)} "
+                f"operations done, {len(self.pending)} started without a response."
+            )
+        else:
+            self.write({"run_id": run_id})
+
+    def replay(self, record):
+        if "run_id" in record:
+            self.journal_run_id = record["run_id"]
+        elif record["status"] == "done":
+            self.done[record["token"]] = record
+            self.pending.pop(record["token"], None)
+        else:
+            self.pending[record["token"]] = record
+
+    def pending_creates(self):
+        """Links of the creates that were sent without a response arriving."""
+        return [
+            record["link"]
+            for record in self.pending.values()
+            if record["op"] == "create"
+        ]
+
+    def start(self, token, link, op):
+        record = {"token": token, "link": link, "op": op, "status": "started"}
+        record["time"] = time.time()
+        self.pending[token] = record
+        self.write(record)
+
+    def complete(self, token, link, op, record_id=None):
+        record = {"token": token, "link": link, "op": op, "status": "done"}
+        record["id"] = record_id
+        record["time"] = time.time()
+        self.done[token] = record
+        self.pending.pop(token, None)
+        self.write(record)
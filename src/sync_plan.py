@@ -0,0 +1,154 @@
+import logging
+from src.helper_utils import main_logger_name
+
+logger_name = main_logger_name
+logger = logging.getLogger(logger_name)
+
+
+import math
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+ACTION_CREATE = "create"
+ACTION_UPDATE = "update"
+ACTION_ARCHIVE = "archive"
+ACTION_DELETE = "delete"
+ACTION_SKIP = "skip"
+
+WRITE_ACTIONS = [ACTION_CREATE, ACTION_UPDATE, ACTION_ARCHIVE, ACTION_DELETE]
+
+PLAN_COLUMNS = [
+    "row",
+    "link",
+    "action",
+    "reason",
+    "existing_id",
+    "has_photo",
+    "fingerprint",
+]
+
+
+def is_bookmarked(bookmark_users_id):
+    return bookmark_users_id not in ([0], [], (), 0, None)
+
+
+def build_sync_plan(
+    transformed_rows, existing_entries, fingerprints, yesterday, dates=None
+):
+    """Joins the incoming rows against the existing records index on Link and
+    decides what to do with every row and every past existing record.
+
+    fingerprints holds the fingerprint of each incoming row, dates optionally
+    their already parsed dates (see date_utils.parse_dates). Returns a plan
+    table with one row per decision: row is the 1-based incoming row number
+    (missing for existing records), action one of create/update/archive/
+    delete/skip and reason a short explanation for dry runs."""
+    yesterday = pd.Timestamp(yesterday)
+
+    incoming = pd.DataFrame(
+        {
+            "row": pd.array(range(1, len(transformed_rows) + 1), dtype="Int64"),
+            "link": [row["Link"] for row in transformed_rows],
+            "date": (
+                [row.get("Date") for row in transformed_rows]
+                if dates is None
+                else pd.Series(dates).to_numpy()
+            ),
+            "fingerprint": list(fingerprints),
+            "has_photo": [bool(row.get("Photo")) for row in transformed_rows],
+        }
+    )
+    existing = pd.DataFrame(
+        {
+            "link": list(existing_entries.keys()),
+            "existing_id": pd.array(
+                [e["id"] for e in existing_entries.values()], dtype="Int64"
+            ),
+            "existing_date": [e["Date"] for e in existing_entries.values()],
+            "archived": [bool(e["Archived"]) for e in existing_entries.values()],
+            "bookmarked": [
+                is_bookmarked(e["bookmark_users_id"]) for e in existing_entries.values()
+            ],
+            "existing_fingerprint": [
+                e["fingerprint"] for e in existing_entries.values()
+            ],
+        }
+    )
+
+    # incoming rows
+    merged = incoming.merge(existing, on="link", how="left")
+    past = to_date(merged["date"]) < yesterday
+    is_new = merged["existing_id"].isna().to_numpy()
+    unchanged = (merged["fingerprint"] == merged["existing_fingerprint"]).to_numpy()
+    merged["action"] = np.select(
+        [past, is_new, unchanged],
+        [ACTION_SKIP, ACTION_CREATE, ACTION_SKIP],
+        ACTION_UPDATE,
+    )
+    merged["reason"] = np.select(
+        [past, is_new, unchanged],
+        ["past event", "new event", "unchanged"],
+        "content changed",
+    )
+
+    # past existing records, unless an incoming row moves them into the future
+    rescheduled = existing["link"].isin(merged.loc[~past, "link"])
+    existing_past = to_date(existing["existing_date"]) < yesterday
+    past_existing = existing[existing_past & ~rescheduled].copy()
+    bookmarked = past_existing["bookmarked"].to_numpy(dtype=bool)
+    archived = past_existing["archived"].to_numpy(dtype=bool)
+    past_existing["row"] = pd.array([pd.NA] * len(past_existing), dtype="Int64")
+    past_existing["has_photo"] = False
+    past_existing["fingerprint"] = past_existing["existing_fingerprint"]
+    past_existing["action"] = np.select(
+        [bookmarked & archived, bookmarked],
+        [ACTION_SKIP, ACTION_ARCHIVE],
+        ACTION_DELETE,
+    )
+    past_existing["reason"] = np.select(
+        [bookmarked & archived, bookmarked],
+        ["already archived", "past event bookmarked"],
+        "past event",
+    )
+
+    plan = pd.concat(
+        [past_existing[PLAN_COLUMNS], merged[PLAN_COLUMNS]], ignore_index=True
+    )
+    return plan
+
+
+def to_date(values):
+    # only the date part matters, timestamps and plain dates both parse
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.normalize()
+    return pd.to_datetime(
+        pd.Series(values, dtype="object").str[:10], format="%Y-%m-%d", errors="coerce"
+    )
+
+
+def summarize_plan(plan, bulk_size=None, fetch_entries=False):
+    """Counts the planned actions and the write requests the plan will cost.
+    Photo uploads and record fetches are upper bounds as cached photos are not
+    uploaded again."""
+    counts = plan["action"].value_counts()
+    summary = {action: int(counts.get(action, 0)) for action in WRITE_ACTIONS}
+    summary[ACTION_SKIP] = int(counts.get(ACTION_SKIP, 0))
+
+    writes = sum(summary[action] for action in WRITE_ACTIONS)
+    sent = plan["action"].isin([ACTION_CREATE, ACTION_UPDATE])
+    summary["photo_uploads"] = int((sent & plan["has_photo"]).sum())
+    summary["record_fetches"] = summary[ACTION_ARCHIVE] if fetch_entries else 0
+    summary["write_requests"] = math.ceil(writes / bulk_size) if bulk_size else writes
+    summary["requests"] = (
+        summary["write_requests"] + summary["photo_uploads"] + summary["record_fetches"]
+    )
+    return summary
+
+
+def save_sync_plan(plan, plan_path):
+    plan_path = Path(plan_path)
+    plan_path.parent.mkdir(parents=True, exist_ok=True)
+    plan.to_csv(plan_path, index=False)
+    logger.info(f"Sync plan saved at path: {plan_path}")
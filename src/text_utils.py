@@ -0,0 +1,120 @@
+import logging
+from src.helper_utils import main_logger_name
+
+logger_name = main_logger_name
+logger = logging.getLogger(logger_name)
+
+
+import re
+import html
+
+try:
+    import tiktoken
+except ImportError:  # optional, token counts are approximated without it
+    tiktoken = None
+
+TOKENIZER_ENCODING = "cl100k_base"  # encoding of gpt-3.5-turbo
+
+# lines that carry no information about the event itself, only checked on
+# short standalone lines so a description is never dropped for a mention
+BOILERPLATE_PATTERNS = [
+    # a call to action on its own, "Register now for the AI summit" is kept
+    r"^(register|sign up|rsvp|get your tickets?|book)( (now|here|below|today|online))*"
+    r"\W*(https?://\S+)?$",
+    r"^(follow|like) us\b",
+    r"^(share|tweet) (this|on)\b",
+    r"\bcookies?\b.{0,40}\b(policy|consent|settings)\b",
+    r"^(terms|privacy policy|imprint|impressum)\b",
+    r"^(https?://|www\.)\S+$",
+]
+
+MAX_BOILERPLATE_CHARS = 100
+
+_boilerplate = re.compile("|".join(BOILERPLATE_PATTERNS), re.IGNORECASE)
+_block_tags = re.compile(r"<\s*(br|/p|/div|/li|/h\d|/tr)\b[^>]*>", re.IGNORECASE)
+_hidden_blocks = re.compile(
+    r"<\s*(script|style)\b.*?<\s*/\s*\1\s*>", re.IGNORECASE | re.DOTALL
+)
+_tags = re.compile(r"<[^>]+>")
+
+_encoding = None
+
+
+def get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+    return _encoding
+
+
+def count_tokens(text):
+    encoding = get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # roughly four characters per token for english text
+    return (len(text) + 3) // 4
+
+
+def strip_html(text):
+    text = _hidden_blocks.sub(" ", text)
+    text = _block_tags.sub("\n", text)
+    text = _tags.sub(" ", text)
+    return html.unescape(text)
+
+
+def clean_paragraphs(text):
+    """Drops short boilerplate lines and repeated paragraphs, keeping the
+    first occurrence in place, and collapses the whitespace of the rest."""
+    seen = set()
+    paragraphs = []
+    for line in text.splitlines():
+        paragraph = " ".join(line.split())
+        key = paragraph.lower()
+        if not paragraph or key in seen:
+            continue
+        if len(paragraph) <= MAX_BOILERPLATE_CHARS and _boilerplate.search(paragraph):
+            continue
+        seen.add(key)
+        paragraphs.append(paragraph)
+    return "\n".join(paragraphs)
+
+
+def trim_to_token_budget(text, max_tokens):
+    """Cuts the text to at most max_tokens tokens, at a word boundary when
+    the token count is approximated."""
+    encoding = get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens])
+
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    return cut[: cut.rfind(" ")] if " " in cut else cut
+
+
+def prepare_input_text(text, max_tokens=None):
+    """Strips HTML and boilerplate, removes repeated paragraphs and trims the
+    text to max_tokens. Returns the text and its token counts before and after.
+    A text that would be cleaned away completely falls back to the stripped
+    original, so no row is sent without its description."""
+    text = str(text)
+    tokens_before = count_tokens(text)
+    stripped = strip_html(text)
+    text = clean_paragraphs(stripped) or " ".join(stripped.split())
+    if max_tokens is not None:
+        text = trim_to_token_budget(text, max_tokens)
+    return text, tokens_before, count_tokens(text)
+
+
+def log_tokens_saved(tokens_before, tokens_after):
+    """Logs the tokens prepare_input_text saved on the texts that are sent."""
+    saved = tokens_before - tokens_after
+    logger.info(
+        f"Input trimming saved {saved} of {tokens_before} tokens "
+        f"({saved / tokens_before if tokens_before else 0:.0%})"
+        f"{'' if tiktoken else ' (approximated)'}."
+    )
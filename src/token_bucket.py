@@ -1,3 +1,5 @@
+import asyncio
+import threading
 import time
 
 
@@ -9,21 +11,92 @@ class TokenBucket:
         self._tokens = float(tokens)
         self.fill_rate = float(fill_rate)
         self.timestamp = time.monotonic()
+        self._lock = threading.Lock()
 
-    def consume(self, tokens):
+    def consume(self, tokens, deadline=None):
         """Consume tokens from the bucket. Returns 0 if there were sufficient
-        tokens, otherwise the expected time until enough tokens become available."""
-        if tokens <= self._tokens:
+        tokens, otherwise the time the caller has to wait before using them.
+        The tokens are reserved either way, so concurrent callers queue up
+        behind each other instead of all waiting for the same token. With a
+        deadline (a time.monotonic() value) that comes before the tokens are
+        available nothing is reserved and None is returned."""
+        with self._lock:
+            self._refill()
+            wait = max(0, tokens - self._tokens) / self.fill_rate
+            if deadline is not None and self.timestamp + wait > deadline:
+                return None
             self._tokens -= tokens
-            return 0
-        else:
-            deficit = tokens - self._tokens
-            wait = deficit / self.fill_rate
             return wait
 
+    def acquire(self, tokens=1, deadline=None):
+        """Blocks until the tokens are available. Returns the time waited, or
+        None without waiting when they are not available before deadline."""
+        wait = self.consume(tokens, deadline)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens=1):
+        """Awaitable version of acquire that does not block the event loop."""
+        wait = self.consume(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def drain(self, seconds=0):
+        """Empties the bucket so that the next token is available in `seconds`,
+        e.g. the Retry-After of a 429 response."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, -float(seconds) * self.fill_rate)
+
     def refill(self):
         """Refill tokens in the bucket based on fill_rate. Called automatically during consume."""
+        with self._lock:
+            self._refill()
+
+    def _refill(self):
         now = time.monotonic()
         delta = now - self.timestamp
         self._tokens = min(self.capacity, self._tokens + self.fill_rate * delta)
         self.timestamp = now
+
+
+# NAMED BUCKETS
+XANO_CRUD = "xano_crud"
+XANO_IMAGE = "xano_image"
+IMAGE_CDN = "image_cdn"
+OPENAI = "openai"
+OPENAI_TOKENS = "openai_tokens"  # model tokens (TPM) rather than requests
+
+# tokens (burst size) and fill_rate (tokens/second) per endpoint class
+DEFAULT_RATE_LIMITS = {
+    XANO_CRUD: {"tokens": 10, "fill_rate": 0.2},
+    XANO_IMAGE: {"tokens": 5, "fill_rate": 0.2},
+    IMAGE_CDN: {"tokens": 10, "fill_rate": 5},
+    OPENAI: {"tokens": 3, "fill_rate": 1},
+    OPENAI_TOKENS: {"tokens": 20000, "fill_rate": 1500},
+}
+
+_rate_limits = dict(DEFAULT_RATE_LIMITS)
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def configure_rate_limits(rate_limits):
+    """Overrides the default limits, e.g. with the RATE_LIMITS settings entry.
+    Buckets that were already handed out are replaced on the next get_bucket."""
+    with _buckets_lock:
+        for name, limits in (rate_limits or {}).items():
+            _rate_limits[name] = {**_rate_limits.get(name, {}), **limits}
+            _buckets.pop(name, None)
+
+
+def get_bucket(name):
+    """Returns the process wide bucket for the endpoint class `name`."""
+    with _buckets_lock:
+        if name not in _buckets:
+            if name not in _rate_limits:
+                raise ValueError(f"No rate limit configured for '{name}'")
+            _buckets[name] = TokenBucket(**_rate_limits[name])
+        return _buckets[name]
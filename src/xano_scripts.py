@@ -8,178 +8,290 @@ logger = logging.getLogger(logger_name)
 import pandas as pd
 import numpy as np
 import json
+import hashlib
 
 import requests
+from urllib.parse import urlencode
 
 import time
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 
 from termcolor import colored
 
-from io import BytesIO
-from PIL import Image
 import base64
 
 from typing import Union, Optional, Dict, Any
 
-from src.token_bucket import TokenBucket
-
+from src.token_bucket import get_bucket, XANO_CRUD, XANO_IMAGE
+from src.http_session import get_session
+from src.retry_policy import (
+    RETRYABLE_STATUS_CODES,
+    UNCERTAIN_STATUS_CODES,
+    CircuitOpenError,
+    DeadlineExceededError,
+    UncertainOutcomeError,
+    get_retry_policy,
+    get_circuit_breaker,
+    endpoint_name,
+)
+from src.sync_journal import SyncJournal, operation_token, sync_run_id
+from src.date_utils import parse_dates, to_iso
+from src.sync_plan import (
+    ACTION_CREATE,
+    ACTION_UPDATE,
+    ACTION_ARCHIVE,
+    ACTION_DELETE,
+    ACTION_SKIP,
+    build_sync_plan,
+    summarize_plan,
+    save_sync_plan,
+)
+from src.image_utils import (
+    IMAGE_PRESETS,
+    DEFAULT_PRESET,
+    is_valid_image_url,
+    image_cache_key,
+    transcode_image,
+    download_image,
+    store_image,
+    prepare_images,
+)
 
 HTTP_POST = "POST"
 HTTP_GET = "GET"
 HTTP_DELETE = "DELETE"
 
 
-rate_limiter = TokenBucket(tokens=10, fill_rate=0.2)
-
-
-def api_rate_limit_wait():
-    wait_time = rate_limiter.consume(1)  # Consume 1 token for API REQUEST
-    if wait_time > 0:
-        return wait_time
-    else:
-        return 0
-
-
-def try_parsing_date(text):
-    for fmt in ("%B %d, %Y", "%Y-%m-%d", "%m/%d/%Y"):
-        try:
-            return datetime.datetime.strptime(text, fmt)
-        except ValueError:
-            logger.debug(f"Failed to parse date with format {fmt}")
-            pass
-    logger.error("No valid date format found for text: {text}")
-    raise ValueError("No valid date format found")
-
-
-def convert_image_to_jpg(image_url):
+def convert_image_to_jpg(image_url, image_cache=None, preset=DEFAULT_PRESET):
     # Check if the URL is valid
-    if pd.isna(image_url) or image_url == "NaN":
+    if not is_valid_image_url(image_url):
         logger.warning(f"Invalid URL: {image_url}")
         return None
 
-    time.sleep(api_rate_limit_wait())
-
-    response = requests.get(image_url)
-    if response.status_code != 200:
-        logger.error(f"Failed to download image from {image_url}")
-        raise Exception(f"Failed to download image from {image_url}")
-
-    img = Image.open(BytesIO(response.content))
-
-    # If the image has a palette, convert it to RGBA
-    if img.mode == "P":
-        img = img.convert("RGBA")
-
-    with BytesIO() as output:
-        img.convert("RGB").save(output, "JPEG")
-        output.seek(0)
-        return output.read()
-
-
-def transform_data(event_data):
-    transformed = {}
-    for k, v in event_data.items():
-        if k in ["Date"]:  # timestamp fields
-            date = try_parsing_date(v) if v else None
-            transformed[k] = date.isoformat() if date else None
-        elif k == "Photo" and v:  # handling image
-            jpg_image = convert_image_to_jpg(v)
-            if jpg_image is not None:
-                base64_image = base64.b64encode(jpg_image).decode("utf-8")
-                transformed[k] = f"data:image/jpeg;base64,{base64_image}"
-            else:
-                transformed[k] = None
-        else:  # all other fields
-            transformed[k] = v
-    return transformed
-
-
-def check_existing_records(headers, get_all_endpoint_url):
-    time.sleep(api_rate_limit_wait())
-
-    response = requests.get(get_all_endpoint_url, headers=headers)
-    if response.status_code != 200:
-        error_message = (
-            f"Request failed with status {response.status_code}. "
-            f"Message: {response.text}"
-        )
-        logger.error("Failed to retrieve data from the database.")
-        logger.error(error_message)
-        logger.debug("Exception details: ", exc_info=True)
-        raise Exception(error_message)
-    existing_entries = response.json()
-
-    return {
-        entry["Link"]: {
+    jpg_image, response = download_image(image_url, image_cache, preset)
+    if jpg_image is None:
+        jpg_image = transcode_image(response.content, **IMAGE_PRESETS[preset])
+        store_image(image_cache, image_url, preset, jpg_image, response)
+    return jpg_image
+
+
+def iter_existing_records(headers, get_all_endpoint_url, page_size=None):
+    """Yields the records of the table. Without a page_size the whole table is
+    requested at once, otherwise it is fetched page by page using Xano's
+    page/per_page paging so only one page is held in memory at a time."""
+    if not page_size:
+        get_bucket(XANO_CRUD).acquire()
+
+        response = get_session().get(get_all_endpoint_url, headers=headers)
+        if response.status_code != 200:
+            error_message = (
+                f"Request failed with status {response.status_code}. "
+                f"Message: {response.text}"
+            )
+            logger.error("Failed to retrieve data from the database.")
+            logger.error(error_message)
+            logger.debug("Exception details: ", exc_info=True)
+            raise Exception(error_message)
+        yield from response.json()
+        return
+
+    page = 1
+    while page:
+        separator = "&" if "?" in get_all_endpoint_url else "?"
+        params = urlencode({"page": page, "per_page": page_size})
+        page_url = f"{get_all_endpoint_url}{separator}{params}"
+        response = send_request_with_retry(page_url, HTTP_GET, headers)
+        body = response.json()
+
+        if isinstance(body, list):  # endpoint without paging returns a plain list
+            yield from body
+            return
+
+        items = body.get("items", [])
+        logger.debug(f"Received page {page} with {len(items)} records.")
+        yield from items
+        page = body.get("nextPage") if items else None
+
+
+def check_existing_records(
+    headers,
+    get_all_endpoint_url,
+    ignored_fields=(),
+    page_size=None,
+    keep_entries=True,
+):
+    """Builds an index keyed by Link holding only what the sync decisions need.
+    With keep_entries=False the full records are dropped right away and have
+    to be fetched with fetch_full_entry when an update needs them."""
+    existing_entries = {}
+    for entry in iter_existing_records(headers, get_all_endpoint_url, page_size):
+        existing_entries[entry["Link"]] = {
             "id": entry["id"],
-            "entry": entry,
+            "Date": entry.get("Date"),
+            "Archived": entry.get("Archived"),
             "Highlights": entry.get("Highlights"),
             "bookmark_users_id": entry.get("bookmark_users_id"),
+            "fingerprint": entry_fingerprint(entry, ignored_fields),
+            "Summary": entry.get("Summary"),
+            "description_hash": text_hash(entry.get("Long_Description")),
         }
-        for entry in existing_entries
+        if keep_entries:
+            existing_entries[entry["Link"]]["entry"] = entry
+
+    # parsed once here, the sync plan compares the timestamps directly
+    dates = parse_dates(
+        [e["Date"] for e in existing_entries.values()], sources="xano", errors="coerce"
+    )
+    for existing_entry, date in zip(existing_entries.values(), dates):
+        existing_entry["Date"] = date
+
+    logger.info(f"Indexed {len(existing_entries)} existing records.")
+    return existing_entries
+
+
+def fetch_existing_records(
+    api_key,
+    get_all_endpoint_url,
+    update_summary=True,
+    page_size=None,
+    keep_entries=True,
+):
+    """check_existing_records with the headers and ignored fields
+    send_data_to_xano uses, so the snapshot can be taken before the sync and
+    handed to it as existing_entries."""
+    return check_existing_records(
+        headers=build_headers(api_key),
+        get_all_endpoint_url=get_all_endpoint_url,
+        ignored_fields=build_ignored_fields(update_summary),
+        page_size=page_size,
+        keep_entries=keep_entries,
+    )
+
+
+def build_headers(api_key):
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
     }
 
 
-def entries_are_equal(entry1, entry2):
-    keys_to_compare = [
-        "bookmark_users_id",
-        "AM_PM",
-        "Link",
-        "Name",
-        "Organizer",
-        "Venue",
-        "Month",
-        "Year",
-        "Keyword",
-        "Photo",
-        "Highlights",
-        "Time",
-        "Summary",
-        "Gmaps_link",
-        "Location",
-        "Price",
-        "Date",
-        "Long_Description",
-        "Day",
-        "Category",
-        "Source",
-        "Tags",
-        "Archived",
-    ]
-
-    for key in keys_to_compare:
-        if key == "Photo":
-            # handle the Photo field here
-            continue
-        value1 = entry1.get(key)
-        value2 = entry2.get(key)
-        if key == "Date" and value1 and value2:
-            # parse and compare only the date parts (year, month, day)
-            date1 = datetime.datetime.fromisoformat(value1)
-            date2 = datetime.datetime.fromisoformat(
-                value2 if "T" in value2 else value2 + "T00:00:00"
-            )
-            if (date1.year, date1.month, date1.day) != (
-                date2.year,
-                date2.month,
-                date2.day,
-            ):
-                return False
-        elif key == "Highlights" and (
-            value1 == 0.0 and value2 is None or value1 is None and value2 == 0.0
-        ):
-            # Treat 0.0 and None as equal for the Highlights key
-            continue
-        elif (
-            isinstance(value1, float) and isinstance(value2, list) and len(value2) == 1
-        ):
-            if value1 != float(value2[0]):
-                return False
-        elif value1 != value2:
-            return False
-    return True
+def build_ignored_fields(update_summary=True):
+    # Create list of fields to ignore dynamically
+    ignored_fields = ["bookmark_users_id", "Highlights"]
+    if not update_summary:
+        ignored_fields.append("Summary")
+    return ignored_fields
+
+
+def text_hash(text):
+    if text is None or (isinstance(text, float) and np.isnan(text)):
+        return None
+    return hashlib.sha1(str(text).strip().encode("utf-8")).hexdigest()
+
+
+def reuse_existing_summaries(
+    data,
+    existing_entries,
+    column_for_input="Long_Description",
+    column_for_output="Summary",
+):
+    """Copies the stored Summary of every existing record whose Link and
+    description match a row into column_for_output, so only the other rows
+    have to be summarized. Returns a copy of the DataFrame."""
+    data = data.copy()
+    if column_for_output not in data.columns:
+        data[column_for_output] = None
+    stored = pd.DataFrame(
+        {
+            "description_hash": [
+                e["description_hash"] for e in existing_entries.values()
+            ],
+            "stored_summary": [e["Summary"] for e in existing_entries.values()],
+        },
+        index=list(existing_entries.keys()),
+        dtype="object",
+    )
+    matched = stored.reindex(data["Link"].to_numpy())
+    description_hashes = [text_hash(text) for text in data[column_for_input]]
+    reuse = (
+        (matched["description_hash"].to_numpy() == np.array(description_hashes))
+        & matched["stored_summary"].notna().to_numpy()
+        & (matched["stored_summary"].to_numpy() != "")
+    )
+    data[column_for_output] = data[column_for_output].astype("object")
+    data.loc[reuse, column_for_output] = matched["stored_summary"].to_numpy()[reuse]
+    logger.info(
+        f"Reusing {int(reuse.sum())} stored summaries, {int((~reuse).sum())} rows left to summarize."
+    )
+    return data
+
+
+def fetch_full_entry(existing_entry, headers, get_endpoint_url):
+    if "entry" in existing_entry:
+        return dict(existing_entry["entry"])
+
+    response = send_request_with_retry(
+        get_endpoint_url.format(id=existing_entry["id"]), HTTP_GET, headers
+    )
+    return response.json()
+
+
+FINGERPRINT_KEYS = [
+    "bookmark_users_id",
+    "AM_PM",
+    "Link",
+    "Name",
+    "Organizer",
+    "Venue",
+    "Month",
+    "Year",
+    "Keyword",
+    "Highlights",
+    "Time",
+    "Summary",
+    "Gmaps_link",
+    "Location",
+    "Price",
+    "Date",
+    "Long_Description",
+    "Day",
+    "Category",
+    "Source",
+    "Tags",
+    "Archived",
+]  # Photo is left out as the uploaded image metadata never matches the source url
+
+
+def normalize_field(key, value):
+    if key == "Date" and isinstance(value, str):
+        # compare only the date parts (year, month, day)
+        return value.split("T")[0]
+    if key == "Highlights" and value == 0.0:
+        # Treat 0.0 and None as equal for the Highlights key
+        return None
+    if isinstance(value, list) and len(value) == 1:
+        # Xano returns single numbers wrapped in a list
+        try:
+            return float(value[0])
+        except (TypeError, ValueError):
+            return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def entry_fingerprint(entry, ignored_fields=()):
+    """Stable hash over the normalized compared fields of an entry. Two entries
+    with the same fingerprint are considered unchanged."""
+    normalized = {
+        key: normalize_field(key, entry.get(key))
+        for key in FINGERPRINT_KEYS
+        if key not in ignored_fields
+    }
+    canonical = json.dumps(normalized, sort_keys=True, default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
 
 
 def send_request_with_retry(
@@ -187,71 +299,107 @@ def send_request_with_retry(
     method: str,
     headers: Dict[str, str],
     data: Optional[Union[str, bytes]] = None,
-    max_attempts: int = 6,
+    max_attempts: Optional[int] = None,
+    bucket_name: str = XANO_CRUD,
+    idempotent: bool = True,
 ) -> requests.Response:
-    #
+    """Sends the request under the retry policy and the circuit breaker of its
+    endpoint. Request exceptions (connection errors, timeouts, broken bodies),
+    429 and 5xx answers are retried with jittered backoff until the attempts or
+    the request deadline run out, any other error status is raised right away.
+    Raises CircuitOpenError without sending while the endpoint keeps failing
+    and DeadlineExceededError once the run deadline has passed. Requests that
+    are not idempotent (creates) are not sent again when they may have been
+    applied, they raise UncertainOutcomeError instead."""
     DEFAULT_RETRY_AFTER = 6
-    failure_occurred = False
+    policy = get_retry_policy()
+    breaker = get_circuit_breaker(endpoint_name(method, url))
+    bucket = get_bucket(bucket_name)
+    max_attempts = max_attempts or policy.max_attempts
+    deadline = time.monotonic() + min(policy.request_deadline, policy.run_time_left())
 
     for attempt in range(max_attempts):
-        time.sleep(api_rate_limit_wait())
+        policy.check_run_deadline()
+        breaker.before_request()
+        response = None
         try:
-            if method == HTTP_POST:
-                response = requests.post(url, headers=headers, data=data)
-            elif method == HTTP_GET:
-                response = requests.get(url, headers=headers)
-            elif method == HTTP_DELETE:
-                response = requests.delete(url, headers=headers, data=data)
-
-            # checking Retry-After header and sleeping if necessary
-            if response.status_code == 429:
-                sleep_duration = response.headers.get(
-                    "Retry-After", DEFAULT_RETRY_AFTER
+            if bucket.acquire(deadline=deadline) is None:
+                raise DeadlineExceededError(
+                    f"{method} {url} is rate limited beyond its deadline"
                 )
-                time.sleep(int(sleep_duration))
-
-            response.raise_for_status()
-        except (
-            requests.exceptions.RequestException,
-            requests.exceptions.ConnectTimeout,
-            requests.exceptions.HTTPError,
-            Exception,
-        ) as e:
-            failure_occurred = True
-            wait_time = 2 ** (attempt + 1)
-            logger.warning(
-                f"{colored(f'Attempt {attempt+1}', 'light_red')} failed with error: {e}.\nRetrying in {wait_time} seconds...",
+            response = get_session().request(
+                method, url, headers=headers, data=data, timeout=policy.timeout
             )
-            # Custom warning message
-            if attempt > 0 and isinstance(
-                e, (requests.exceptions.HTTPError, requests.exceptions.ConnectTimeout)
-            ):
-                total_wait_time_minutes = (
-                    sum(2**i for i in range(2, max_attempts + 2)) / 60
-                )
-                logger.warning(
-                    f"Please note that probably due to server-side issues the script might take more than {total_wait_time_minutes:.2f} minutes longer than usual to complete."
-                )
-            time.sleep(wait_time)
-            if attempt == max_attempts - 1:
-                logger.critical(
-                    colored("ALL FAILED!", color="light_red", attrs=["bold"])
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            if not idempotent and response.status_code in UNCERTAIN_STATUS_CODES:
+                breaker.record_failure()
+                raise UncertainOutcomeError(
+                    f"{method} {url} may have been applied: {e}"
+                ) from e
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                # the request itself is wrong, sending it again will not help
+                breaker.record_success()
+                logger.error(
+                    f"{colored(f'{method} {url}', 'light_red')} failed with error: {e}.\nResponse body: {response.text}"
                 )
-                try:
-                    logger.critical(f"Response body: {response.text}")
-                except UnboundLocalError:
-                    logger.critical("Response object is not available.")
-                logger.exception("Exception details: ")
                 raise
+            error = e
+        except requests.exceptions.RequestException as e:
+            # connection errors, timeouts and broken or undecodable bodies
+            if not idempotent and not isinstance(e, requests.exceptions.ConnectTimeout):
+                # only a request that never got a connection is surely not applied
+                breaker.record_failure()
+                raise UncertainOutcomeError(
+                    f"{method} {url} may have been applied: {e}"
+                ) from e
+            error = e
+        except BaseException:
+            # not a failure of the endpoint, but a half open trial must not block it
+            breaker.release_trial()
+            raise
         else:
-            if failure_occurred:
+            breaker.record_success()
+            if attempt > 0:
                 logger.warning(
                     f"{colored(f'Attempt {attempt+1}', 'light_green')} was successful after {attempt} failed attempt{'s 'if attempt > 1 else ''}."
                 )
-            # Reset the failure flag for next function call
-            failure_occurred = False
             return response
-    return None  # This should never be reached but is included for completeness
+
+        breaker.record_failure()
+        wait_time = policy.backoff(attempt)
+        retry_after = 0
+        if response is not None and response.status_code == 429:
+            # checking Retry-After header
+            retry_after = response.headers.get("Retry-After", DEFAULT_RETRY_AFTER)
+            try:
+                retry_after = float(retry_after)
+            except ValueError:  # Retry-After given as an HTTP date
+                retry_after = DEFAULT_RETRY_AFTER
+
+        if (
+            attempt == max_attempts - 1
+            or time.monotonic() + max(wait_time, retry_after) > deadline
+        ):
+            logger.critical(colored("ALL FAILED!", color="light_red", attrs=["bold"]))
+            if response is not None:
+                logger.critical(f"Response body: {response.text}")
+            if attempt < max_attempts - 1:
+                raise DeadlineExceededError(
+                    f"{method} {url} still failing after {attempt+1} attempts"
+                ) from error
+            raise error
+
+        if retry_after:
+            # holding back every caller of the bucket, the next acquire waits
+            # out Retry-After
+            bucket.drain(retry_after)
+            wait_time = max(0, wait_time - retry_after)
+
+        logger.warning(
+            f"{colored(f'Attempt {attempt+1}', 'light_red')} failed with error: {error}.\nRetrying in {wait_time:.1f} seconds...",
+        )
+        time.sleep(wait_time)
 
 
 # def send_request_with_retry(
@@ -316,24 +464,144 @@ def send_request_with_retry(
 #     return None  # This should never be reached but is included for completeness
 
 
-def update_entry_and_print(
-    transformed_row, headers, edit_url, current_event_id, row_index
+OP_CREATE = "create"
+OP_EDIT = "edit"
+OP_DELETE = "delete"
+
+OPERATION_COLORS = {
+    "CREATED": "light_blue",
+    "UPDATED": "light_yellow",
+    "ARCHIVE": "white",
+    "DELETED": "light_magenta",
+}
+
+
+def build_operation(
+    op, link, label, record_id=None, data=None, row_index=None, token=None
 ):
-    response = send_request_with_retry(
-        edit_url, "POST", headers, json.dumps(transformed_row)
+    """An operation is a plain dict so it can be sent on its own, packed into a
+    bulk payload or written to disk. row_index is None for existing entries,
+    token is the operation_token used by the sync journal."""
+    return {
+        "op": op,
+        "id": record_id,
+        "link": link,
+        "label": label,
+        "row_index": row_index,
+        "data": data,
+        "token": token,
+    }
+
+
+def print_operation(operation, record_id):
+    label = colored(
+        operation["label"], color=OPERATION_COLORS[operation["label"]], attrs=["bold"]
     )
-    if current_event_id == row_index:
-        logger.info(
-            f"    {colored('ARCHIVE', color='white', attrs=['bold'])} ID {colored(current_event_id, color='magenta')} {transformed_row['Link']}"
+    row_index = operation["row_index"] or "   "
+    logger.info(
+        f"{row_index} {label} ID {colored(record_id, color='magenta')} {operation['link']}"
+    )
+
+
+def execute_operation(
+    operation,
+    headers,
+    send_endpoint_url,
+    edit_endpoint_url,
+    delete_endpoint_url,
+    journal=None,
+):
+    """Sends a single operation and returns the response body (None for deletes)."""
+    if journal is not None and operation["token"]:
+        journal.start(operation["token"], operation["link"], operation["op"])
+
+    if operation["op"] == OP_CREATE:
+        response = send_request_with_retry(
+            send_endpoint_url,
+            HTTP_POST,
+            headers,
+            json.dumps(operation["data"]),
+            idempotent=False,
+        )
+        response_json = response.json()
+        record_id = response_json["id"]
+    elif operation["op"] == OP_EDIT:
+        response = send_request_with_retry(
+            edit_endpoint_url.format(id=operation["id"]),
+            HTTP_POST,
+            headers,
+            json.dumps(operation["data"]),
         )
+        response_json = response.json()
+        record_id = operation["id"]
     else:
-        logger.info(
-            f"{row_index} {colored('UPDATED', color='light_yellow', attrs=['bold'])} ID {colored(current_event_id, color='magenta')} {transformed_row['Link']}"
+        send_request_with_retry(
+            delete_endpoint_url.format(id=operation["id"]),
+            HTTP_DELETE,
+            headers,
+            data=json.dumps(operation["data"]),
         )
-    response_json = response.json()
+        response_json = None
+        record_id = operation["id"]
+
+    if journal is not None and operation["token"]:
+        journal.complete(
+            operation["token"], operation["link"], operation["op"], record_id
+        )
+    print_operation(operation, record_id)
     return response_json
 
 
+def execute_bulk_operations(operations, headers, bulk_endpoint_url, journal=None):
+    """Sends the operations as one bulk request. The endpoint receives
+    {"operations": [{"op", "id", "data"}, ...]} and answers with
+    {"results": [{"status", "body"}, ...]} in the same order, which is used to
+    map every result back to its row. Returns the response bodies in the order
+    of the operations (None for deletes and failed items)."""
+    payload = {
+        "operations": [
+            {"op": operation["op"], "id": operation["id"], "data": operation["data"]}
+            for operation in operations
+        ]
+    }
+    if journal is not None:
+        for operation in operations:
+            if operation["token"]:
+                journal.start(operation["token"], operation["link"], operation["op"])
+    response = send_request_with_retry(
+        bulk_endpoint_url,
+        HTTP_POST,
+        headers,
+        json.dumps(payload),
+        idempotent=all(operation["op"] != OP_CREATE for operation in operations),
+    )
+    items = response.json()["results"]
+    if len(items) != len(operations):
+        raise Exception(
+            f"Bulk endpoint returned {len(items)} results for {len(operations)} operations"
+        )
+
+    results = []
+    for operation, item in zip(operations, items):
+        body = item.get("body")
+        if item.get("status", 200) != 200:
+            logger.error(
+                f"{operation['row_index'] or '   '} {colored('FAILED', color='light_red', attrs=['bold'])} "
+                f"{operation['op']} {operation['link']}: {body}"
+            )
+            results.append(None)
+            continue
+
+        record_id = body["id"] if operation["op"] == OP_CREATE else operation["id"]
+        if journal is not None and operation["token"]:
+            journal.complete(
+                operation["token"], operation["link"], operation["op"], record_id
+            )
+        print_operation(operation, record_id)
+        results.append(None if operation["op"] == OP_DELETE else body)
+    return results
+
+
 def skip_entry_and_print(row_index, current_event_id, link):
     if current_event_id == None:
         logger.info(
@@ -345,194 +613,491 @@ def skip_entry_and_print(row_index, current_event_id, link):
         )
 
 
-def send_data_to_xano(
-    data,
-    api_key,
+def build_existing_operation(
+    link, entry, action, headers, table_name, get_endpoint_url=None, token=None
+):
+    """Returns the archive or delete operation for a past existing record."""
+    current_event_id = entry["id"]
+
+    if action == ACTION_ARCHIVE:
+        # the edit endpoint expects the complete record
+        full_entry = fetch_full_entry(entry, headers, get_endpoint_url)
+
+        full_entry["Archived"] = True  # sets archived field to true
+
+        full_entry[f"{table_name}_id"] = full_entry.pop("id")  # changing name of id key
+
+        return build_operation(
+            OP_EDIT,
+            link,
+            "ARCHIVE",
+            record_id=current_event_id,
+            data=full_entry,
+            token=token,
+        )
+
+    delete_param = {f"{table_name}_id": int(current_event_id)}
+    return build_operation(
+        OP_DELETE,
+        link,
+        "DELETED",
+        record_id=current_event_id,
+        data=delete_param,
+        token=token,
+    )
+
+
+def upload_photo(
+    image_url,
+    headers,
     image_endpoint_url,
-    send_endpoint_url,
-    check_endpoint_url,
-    edit_endpoint_url,
-    delete_endpoint_url,
-    table_name,
-    update_summary: bool = True,
+    image_cache=None,
+    preset=DEFAULT_PRESET,
+    prepared_images=None,
 ):
-    if isinstance(data, pd.DataFrame):
-        data = data.replace({np.nan: None})
-        data = data.to_dict(orient="records")
+    # an unchanged photo that was uploaded before costs no request at all
+    if image_cache is not None:
+        cached = image_cache.lookup(image_cache_key(image_url, preset))
+        if cached is not None and cached["fresh"]:
+            image_metadata = image_cache.get_xano_metadata(cached["content_hash"])
+            if image_metadata is not None:
+                return [image_metadata]
+
+    if prepared_images and image_url in prepared_images:
+        jpg_image = prepared_images[image_url]
+    else:
+        jpg_image = convert_image_to_jpg(image_url, image_cache, preset)
+    if jpg_image is None:
+        return None
 
-    headers = {
-        "Authorization": f"Bearer {api_key}",
+    if image_cache is None:
+        return [send_photo(jpg_image, headers, image_endpoint_url)]
+
+    content_hash = hashlib.sha256(jpg_image).hexdigest()
+    with image_cache.upload_lock(content_hash):
+        image_metadata = image_cache.get_xano_metadata(content_hash)
+        if image_metadata is not None:
+            return [image_metadata]
+        photo = send_photo(jpg_image, headers, image_endpoint_url)
+        image_cache.put_xano_metadata(content_hash, photo)
+    return [photo]
+
+
+def send_photo(jpg_image, headers, image_endpoint_url):
+    base64_image = base64.b64encode(jpg_image).decode("utf-8")
+    response = send_request_with_retry(
+        image_endpoint_url,
+        "POST",
+        headers,
+        json.dumps({"content": f"data:image/jpeg;base64,{base64_image}"}),
+        bucket_name=XANO_IMAGE,
+    )
+
+    image_metadata = response.json()
+    return {
+        "path": image_metadata["path"],
+        "name": image_metadata["name"],
+        "type": image_metadata["type"],
+        "size": image_metadata["size"],
+        "mime": image_metadata["mime"],
+        "meta": image_metadata["meta"],
     }
 
-    response_list = []
 
-    logger.info(colored(f"Accessing Xano data base {table_name}...\n", "cyan"))
-    table_name = table_name.replace(" ", "_").lower()
+def build_row_operation(
+    transformed_row,
+    row_index,
+    action,
+    current_event_id,
+    existing_entries,
+    headers,
+    image_endpoint_url,
+    table_name,
+    image_cache=None,
+    image_preset=DEFAULT_PRESET,
+    prepared_images=None,
+    token=None,
+):
+    """Uploads the photo of a row that has to be sent and returns its create or
+    edit operation. Skipped rows are logged and return None."""
+    link = transformed_row["Link"]
+
+    if action == ACTION_SKIP:
+        skip_entry_and_print(row_index, current_event_id, link)
+        return None
+
+    # the photo is only downloaded and uploaded once the row is known to be sent
+    if transformed_row.get("Photo"):
+        transformed_row["Photo"] = upload_photo(
+            transformed_row["Photo"],
+            headers,
+            image_endpoint_url,
+            image_cache,
+            image_preset,
+            prepared_images,
+        )
+
+    if action == ACTION_UPDATE:
+        if existing_entries[link]["bookmark_users_id"]:
+            transformed_row["bookmark_users_id"] = existing_entries[link][
+                "bookmark_users_id"
+            ]
+
+        if existing_entries[link]["Highlights"]:
+            transformed_row["Highlights"] = existing_entries[link]["Highlights"]
+
+        transformed_row[f"{table_name}_id"] = current_event_id
+
+        return build_operation(
+            OP_EDIT,
+            link,
+            "UPDATED",
+            record_id=current_event_id,
+            data=transformed_row,
+            row_index=row_index,
+            token=token,
+        )
 
-    existing_entries = check_existing_records(
-        headers=headers, get_all_endpoint_url=check_endpoint_url
+    return build_operation(
+        OP_CREATE,
+        link,
+        "CREATED",
+        data=transformed_row,
+        row_index=row_index,
+        token=token,
     )
 
-    yesterday = datetime.datetime.now().date() - timedelta(days=1)
 
-    #
-    # loop over existing entries for archive/delete
-    for link, entry in existing_entries.items():
-        if entry["entry"]["Date"]:
-            event_date_str = entry["entry"]["Date"].split("T")[0]
-            event_date = datetime.datetime.strptime(event_date_str, "%Y-%m-%d").date()
-
-        # Updating archived or deleting old events
-        if event_date < yesterday:
-            current_event_id = entry["entry"]["id"]
-            if (  # checks if user has bookmarked this past event
-                entry["entry"]["bookmark_users_id"] != [0]
-                and entry["entry"]["bookmark_users_id"] != []
-                and entry["entry"]["bookmark_users_id"] != ()
-                and entry["entry"]["bookmark_users_id"] != 0
-                and entry["entry"]["bookmark_users_id"] != None
-            ):  # checks if user has bookmarked this past event
-                if entry["entry"]["Archived"]:  # checks if event is already archived
-                    continue
-
-                entry["entry"]["Archived"] = True  # sets archived field to true
-
-                edit_url = edit_endpoint_url.format(id=current_event_id)
-
-                entry["entry"][f"{table_name}_id"] = entry["entry"].pop(
-                    "id"
-                )  # changing name of id key
-
-                response_json = update_entry_and_print(
-                    entry["entry"],
-                    headers,
-                    edit_url,
-                    current_event_id,
-                    current_event_id,
-                )
-                response_list.append(response_json)
-
-            else:
-                # Delete the entry
-                if current_event_id:
-                    delete_url = delete_endpoint_url.format(id=current_event_id)
-                    delete_param = {f"{table_name}_id": int(current_event_id)}
-                    time.sleep(api_rate_limit_wait())
-                    response = send_request_with_retry(
-                        delete_url,
-                        "DELETE",
-                        headers,
-                        data=json.dumps(delete_param),
-                    )
-                    logger.info(
-                        f"    {colored('DELETED', color='light_magenta', attrs=['bold'])} ID {colored(current_event_id, 'magenta')} {link}"
-                    )
-                    # del existing_entries[link]  # delete the entry from existing_entries
+def collect_results(futures, deferred=None):
+    """Returns the results of the futures in submission order. On the first
+    failure the remaining futures are cancelled and the error is re-raised.
+
+    With a deferred list, futures that failed on an open circuit, an exceeded
+    deadline or an uncertain create are recorded there as (index, error) and
+    give None instead."""
+    results = []
+    for i, future in enumerate(futures):
+        try:
+            results.append(future.result())
+        except (
+            CircuitOpenError,
+            DeadlineExceededError,
+            UncertainOutcomeError,
+        ) as e:
+            if deferred is None:
+                for pending in futures[i + 1 :]:
+                    pending.cancel()
+                raise
+            deferred.append((i, e))
+            results.append(None)
+        except Exception:
+            for pending in futures[i + 1 :]:
+                pending.cancel()
+            raise
+    return results
+
+
+def log_deferred(row_index, link, error):
+    logger.warning(
+        f"{row_index or '   '} {colored('DEFERRED', color='yellow', attrs=['bold'])} {link} ({error})"
+    )
 
-    # Create list of fields to ignore dynamically
-    ignored_fields = ["bookmark_users_id", "Highlights"]
-    if not update_summary:
-        ignored_fields.append("Summary")
 
-    # loop over new data from df
-    for i, row in enumerate(data):
-        row_index = i + 1
-        row_index = f"{row_index:4}"
+def reconcile_journal(plan, journal, existing_entries):
+    """Drops the operations of the plan the journal of a crashed run has as
+    done, e.g. a create the snapshot does not
+    show yet. Creates that were sent without a response are looked up by Link
+    in the snapshot: found means they landed and the plan already treats them
+    as existing, missing means they are created again."""
+    for link in journal.pending_creates():
+        landed = link in existing_entries
+        logger.info(
+            f"    {colored('RECONCILED', color='light_green', attrs=['bold'])} {link} "
+            f"({'created in the previous run' if landed else 'not created, sending again'})"
+        )
 
-        transformed_row = transform_data(row)
-        link = transformed_row["Link"]
+    resumed = plan["token"].isin(list(journal.done)) & (plan["action"] != ACTION_SKIP)
+    for row, link in zip(plan.loc[resumed, "row"], plan.loc[resumed, "link"]):
+        row_index = "   " if pd.isna(row) else f"{row:4}"
+        logger.info(
+            f"{row_index} {colored('SKIPPED', color='light_green', attrs=['bold'])} {link} (done in the previous run)"
+        )
+    return plan[~resumed]
 
-        # Process image metadata
-        if "Photo" in transformed_row and transformed_row["Photo"]:
-            base64_image = transformed_row["Photo"]
-            response = send_request_with_retry(
-                image_endpoint_url,
-                "POST",
+
+def execute_sync_plan(
+    plan,
+    transformed_rows,
+    existing_entries,
+    headers,
+    table_name,
+    endpoints,
+    max_workers=1,
+    image_cache=None,
+    image_preset=DEFAULT_PRESET,
+    image_processes=None,
+    bulk_size=50,
+    journal=None,
+):
+    """Runs the plan from build_sync_plan. endpoints holds the image, send,
+    edit, delete, get and bulk endpoint urls; without a bulk url every
+    operation is sent on its own. Operations the journal has as done are
+    skipped, see reconcile_journal and operation_token.
+
+    Operations that hit an open circuit or the run deadline are deferred: they
+    are logged, left out of the journal and picked up by the next run. Returns
+    the response bodies in plan order and the number of deferred operations."""
+    plan = plan.assign(
+        token=[
+            operation_token(link, action, fingerprint)
+            for link, action, fingerprint in zip(
+                plan["link"], plan["action"], plan["fingerprint"]
+            )
+        ]
+    )
+    if journal is not None:
+        plan = reconcile_journal(plan, journal, existing_entries)
+
+    existing_plan = plan[plan["row"].isna()]
+    row_plan = plan[plan["row"].notna()]
+
+    # max_workers=1 keeps the original one-request-at-a-time behaviour, more
+    # workers overlap the network round trips while sharing the rate limiters
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        #
+        # archive/delete past existing entries
+        archive_futures = [
+            executor.submit(
+                build_existing_operation,
+                link,
+                existing_entries[link],
+                action,
                 headers,
-                json.dumps({"content": base64_image}),
+                table_name,
+                endpoints["get"],
+                token,
             )
-
-            image_metadata = response.json()
-            transformed_row["Photo"] = [
-                {
-                    "path": image_metadata["path"],
-                    "name": image_metadata["name"],
-                    "type": image_metadata["type"],
-                    "size": image_metadata["size"],
-                    "mime": image_metadata["mime"],
-                    "meta": image_metadata["meta"],
-                }
-            ]
-
-        # check if the current event is in the existing entries and if so, set current_event_id
-        # if link in existing_entries:
-        #     print(existing_entries[link]["entry"]["id"])
-        current_event_id = (
-            existing_entries[link]["entry"]["id"] if link in existing_entries else None
+            for link, action, token in zip(
+                existing_plan["link"], existing_plan["action"], existing_plan["token"]
+            )
+            if action in (ACTION_ARCHIVE, ACTION_DELETE)
+        ]
+        deferred = []
+        archive_links = [
+            link
+            for link, action in zip(existing_plan["link"], existing_plan["action"])
+            if action in (ACTION_ARCHIVE, ACTION_DELETE)
+        ]
+        operations = collect_results(archive_futures, deferred)
+        for i, error in deferred:
+            log_deferred(None, archive_links[i], error)
+
+        # only photos of rows that get sent are prepared
+        prepared_images = prepare_images(
+            [
+                transformed_rows[row - 1].get("Photo")
+                for row, action in zip(row_plan["row"], row_plan["action"])
+                if action in (ACTION_CREATE, ACTION_UPDATE)
+            ],
+            preset=image_preset,
+            image_cache=image_cache,
+            max_processes=image_processes,
         )
-        colored_event_id = colored(current_event_id, "magenta")
 
-        # Skip events with a date in the past
-        if "Date" in transformed_row:
-            if transformed_row["Date"]:
-                event_date_str = transformed_row["Date"].split("T")[0]
-                event_date = datetime.datetime.strptime(
-                    event_date_str, "%Y-%m-%d"
-                ).date()  # convert the date string to a date object
-
-            if event_date < yesterday:
-                skip_entry_and_print(
-                    row_index, current_event_id, transformed_row["Link"]
-                )
-                continue  # move to the next row in data if this event is in the past
-
-        if current_event_id:
-            if entries_are_equal(
-                {k: v for k, v in transformed_row.items() if k not in ignored_fields},
-                {
-                    k: v
-                    for k, v in existing_entries[link]["entry"].items()
-                    if k not in ignored_fields
-                },
-            ):
-                skip_entry_and_print(
-                    row_index, current_event_id, transformed_row["Link"]
+        # loop over new data from df
+        row_futures = [
+            executor.submit(
+                build_row_operation,
+                transformed_rows[row - 1],
+                f"{row:4}",
+                action,
+                None if pd.isna(existing_id) else int(existing_id),
+                existing_entries,
+                headers,
+                endpoints["image"],
+                table_name,
+                image_cache,
+                image_preset,
+                prepared_images,
+                token,
+            )
+            for row, action, existing_id, token in zip(
+                row_plan["row"],
+                row_plan["action"],
+                row_plan["existing_id"],
+                row_plan["token"],
+            )
+        ]
+        row_deferred = []
+        operations += collect_results(row_futures, row_deferred)
+        for i, error in row_deferred:
+            log_deferred(
+                f"{row_plan['row'].iloc[i]:4}", row_plan["link"].iloc[i], error
+            )
+        operations = [op for op in operations if op is not None]
+        deferred_count = len(deferred) + len(row_deferred)
+
+        if endpoints["bulk"]:
+            batches = [
+                operations[start : start + bulk_size]
+                for start in range(0, len(operations), bulk_size)
+            ]
+            batch_futures = [
+                executor.submit(
+                    execute_bulk_operations, batch, headers, endpoints["bulk"], journal
                 )
-                continue
-            else:
-                edit_url = edit_endpoint_url.format(id=current_event_id)
+                for batch in batches
+            ]
+            deferred = []
+            batch_results = collect_results(batch_futures, deferred)
+            for i, error in deferred:
+                for operation in batches[i]:
+                    log_deferred(operation["row_index"], operation["link"], error)
+                batch_results[i] = [None] * len(batches[i])
+                deferred_count += len(batches[i])
+            return [r for batch in batch_results for r in batch], deferred_count
+
+        operation_futures = [
+            executor.submit(
+                execute_operation,
+                operation,
+                headers,
+                endpoints["send"],
+                endpoints["edit"],
+                endpoints["delete"],
+                journal,
+            )
+            for operation in operations
+        ]
+        deferred = []
+        results = collect_results(operation_futures, deferred)
+        for i, error in deferred:
+            log_deferred(operations[i]["row_index"], operations[i]["link"], error)
+        return results, deferred_count + len(deferred)
+
 
-                if existing_entries[link]["entry"]["bookmark_users_id"]:
-                    transformed_row["bookmark_users_id"] = existing_entries[link][
-                        "entry"
-                    ]["bookmark_users_id"]
+def send_data_to_xano(
+    data,
+    api_key,
+    image_endpoint_url,
+    send_endpoint_url,
+    check_endpoint_url,
+    edit_endpoint_url,
+    delete_endpoint_url,
+    table_name,
+    update_summary: bool = True,
+    max_workers: int = 1,
+    image_cache=None,
+    image_preset: str = DEFAULT_PRESET,
+    image_processes: Optional[int] = None,
+    get_endpoint_url: Optional[str] = None,
+    page_size: Optional[int] = None,
+    bulk_endpoint_url: Optional[str] = None,
+    bulk_size: int = 50,
+    plan_path: Optional[str] = None,
+    dry_run: bool = False,
+    journal_path: Optional[str] = None,
+    existing_entries: Optional[dict] = None,
+):
+    """existing_entries is a snapshot from fetch_existing_records taken with
+    the same update_summary, it saves fetching the records again."""
+    if isinstance(data, pd.DataFrame):
+        data = data.replace({np.nan: None})
+        data = data.to_dict(orient="records")
 
-                if existing_entries[link]["entry"]["Highlights"]:
-                    transformed_row["Highlights"] = existing_entries[link]["entry"][
-                        "Highlights"
-                    ]
+    # set once up front as the headers are shared between the worker threads
+    headers = build_headers(api_key)
 
-                transformed_row[f"{table_name}_id"] = current_event_id
+    logger.info(colored(f"Accessing Xano data base {table_name}...\n", "cyan"))
+    table_name = table_name.replace(" ", "_").lower()
 
-                response_json = update_entry_and_print(
-                    transformed_row, headers, edit_url, current_event_id, row_index
-                )
+    ignored_fields = build_ignored_fields(update_summary)
 
-                response_list.append(response_json)
-                continue
+    # the run deadline of the retry policy counts from here
+    get_retry_policy().start_run()
 
-        row_json = json.dumps(transformed_row)
-        headers.update({"Content-Type": "application/json"})
+    # full records are only kept when there is no endpoint to fetch them later
+    if existing_entries is None:
+        existing_entries = check_existing_records(
+            headers=headers,
+            get_all_endpoint_url=check_endpoint_url,
+            ignored_fields=ignored_fields,
+            page_size=page_size,
+            keep_entries=get_endpoint_url is None,
+        )
 
-        response = send_request_with_retry(send_endpoint_url, "POST", headers, row_json)
+    yesterday = datetime.datetime.now().date() - timedelta(days=1)
 
-        if response.status_code == 200:
-            current_event_id = response.json()["id"]
-            logger.info(
-                f"{row_index} {colored('CREATED', color='light_blue', attrs=['bold'])} ID {colored(current_event_id, 'magenta')} {transformed_row['Link']}"
+    # PLAN
+    # all dates are parsed in one pass with the format inferred per source
+    dates = parse_dates(
+        [row.get("Date") for row in data], sources=[row.get("Source") for row in data]
+    )
+    transformed_rows = []
+    for row, iso_date in zip(data, to_iso(dates)):
+        # photos are only uploaded once the plan knows the row is sent
+        transformed_row = dict(row)
+        if "Date" in transformed_row:
+            transformed_row["Date"] = iso_date
+        transformed_rows.append(transformed_row)
+    fingerprints = [entry_fingerprint(row, ignored_fields) for row in transformed_rows]
+    plan = build_sync_plan(
+        transformed_rows, existing_entries, fingerprints, yesterday, dates=dates
+    )
+    summary = summarize_plan(
+        plan,
+        bulk_size=bulk_size if bulk_endpoint_url else None,
+        fetch_entries=get_endpoint_url is not None,
+    )
+    logger.info(colored(f"Sync plan: {summary}", "cyan"))
+    if plan_path is not None:
+        save_sync_plan(plan, plan_path)
+    if dry_run:
+        logger.info("Dry run, nothing was sent to Xano.")
+        return []
+
+    # EXECUTE
+    # the journal survives a failed run so the next run can resume from it
+    journal = None
+    if journal_path is not None:
+        run_id = sync_run_id([row["Link"] for row in transformed_rows], fingerprints)
+        journal = SyncJournal(journal_path, run_id)
+    try:
+        results, deferred_count = execute_sync_plan(
+            plan,
+            transformed_rows,
+            existing_entries,
+            headers,
+            table_name,
+            endpoints={
+                "image": image_endpoint_url,
+                "send": send_endpoint_url,
+                "edit": edit_endpoint_url,
+                "delete": delete_endpoint_url,
+                "get": get_endpoint_url,
+                "bulk": bulk_endpoint_url,
+            },
+            max_workers=max_workers,
+            image_cache=image_cache,
+            image_preset=image_preset,
+            image_processes=image_processes,
+            bulk_size=bulk_size,
+            journal=journal,
+        )
+    except Exception:
+        if journal is not None:
+            journal.close()
+        raise
+    if deferred_count:
+        logger.warning(
+            colored(
+                f"{deferred_count} operations deferred to the next run as Xano kept failing.",
+                "yellow",
             )
+        )
+    if journal is not None:
+        # deferred operations are not done, the journal has to stay for them
+        journal.close(finished=not deferred_count)
 
-        response_json = response.json()
-        response_list.append(response_json)
-
+    response_list = [r for r in results if r is not None]
     return response_list
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+from src.data_utils import (
+    compile_keyword_matcher,
+    filter_out_mask,
+    joined_text,
+    keyword_mask,
+    manipulate_csv_data,
+)
+
+EVENTS = pd.DataFrame(
+    {
+        "Name": ["Intro to C++", "Node.js meetup", "Nodejs night", "Pottery class"],
+        "Long_Description": ["Templates", "Build APIs", np.nan, "Hands on CLAY"],
+    }
+)
+
+
+def test_literal_keywords_match_dots_and_pluses_as_text():
+    mask, matches = filter_out_mask(
+        EVENTS, ["Name", "Long_Description"], ["C++", "node.js"]
+    )
+    # "node.js" no longer matches "nodejs" as the dot is not a wildcard
+    assert list(mask) == [True, True, False, False]
+    assert list(matches[mask]) == [("c++", "Name"), ("node.js", "Name")]
+
+
+def test_regex_keywords_are_opt_in():
+    mask, matches = filter_out_mask(
+        EVENTS, ["Name", "Long_Description"], [r"node\.?js", r"\bclay\b"], regex=True
+    )
+    assert list(mask) == [False, True, True, True]
+    # the keyword as configured is reported, not the matched text
+    assert list(matches[mask]) == [
+        (r"node\.?js", "Name"),
+        (r"node\.?js", "Name"),
+        (r"\bclay\b", "Long_Description"),
+    ]
+
+
+def test_missing_cells_and_no_keywords_match_nothing():
+    mask, matches = filter_out_mask(EVENTS, ["Long_Description"], ["nan"])
+    assert not mask.any()
+    mask, matches = filter_out_mask(EVENTS, ["Name"], [])
+    assert not mask.any() and list(matches) == [None] * 4
+
+
+def test_filter_out_keywords_operation_reads_the_regex_option(tmp_path):
+    operation = {
+        "action": "filter_out_keywords",
+        "columns": ["Name"],
+        "keywords": [r"node\.?js"],
+    }
+    output = tmp_path / "events.csv"
+    literal = manipulate_csv_data(
+        output_filepath=output, operations=[operation], input_df=EVENTS.copy()
+    )
+    regex = manipulate_csv_data(
+        output_filepath=output,
+        operations=[{**operation, "regex": True}],
+        input_df=EVENTS.copy(),
+    )
+    assert len(literal) == 4
+    assert list(regex["Name"]) == ["Intro to C++", "Pottery class"]
+
+
+def iterrows_mask(df, columns, keywords, skip_columns):
+    # the implementation filter_for_keywords used before
+    mask = []
+    for index, row in df.iterrows():
+        row_text = " ".join(
+            str(row[column]).lower() for column in columns if column not in skip_columns
+        )
+        mask.append(any(keyword in row_text for keyword in keywords))
+    return np.array(mask, dtype=bool)
+
+
+def test_keyword_mask_matches_the_row_by_row_filter():
+    columns = ["Name", "Long_Description", "Keyword"]
+    df = EVENTS.assign(Keyword=["ai", np.nan, "web3", "ai"])
+    for keywords, skip_columns in [
+        (["templates", "api"], []),
+        (["c++ templates", "meetup build"], []),  # across the joined columns
+        (["nan", "web3"], []),  # missing cells read as "nan" in both
+        (["ai", "clay"], ["Keyword"]),
+        (["ai"], ["Name", "Long_Description", "Keyword"]),
+        ([], []),
+    ]:
+        row_texts = joined_text(
+            df, [column for column in columns if column not in skip_columns]
+        )
+        mask = keyword_mask(row_texts, compile_keyword_matcher(keywords))
+        assert np.array_equal(
+            mask, iterrows_mask(df, columns, keywords, skip_columns)
+        ), keywords
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from src import date_utils
+from src.date_utils import parse_dates, to_iso
+
+
+@pytest.fixture(autouse=True)
+def empty_format_cache():
+    date_utils._format_cache.clear()
+    yield
+    date_utils._format_cache.clear()
+
+
+def test_formats_are_inferred_per_source():
+    parsed = parse_dates(
+        ["March 05, 2024", "2024-03-06", "03/07/2024", "2024-03-08T18:30:00+01:00"],
+        sources=["Eventbrite", "Meetup", "Other", "xano"],
+    )
+    assert list(parsed) == [
+        pd.Timestamp("2024-03-05"),
+        pd.Timestamp("2024-03-06"),
+        pd.Timestamp("2024-03-07"),
+        pd.Timestamp("2024-03-08 18:30"),
+    ]
+    assert date_utils._format_cache == {
+        "Eventbrite": "%B %d, %Y",
+        "Meetup": "%Y-%m-%d",
+        "Other": "%m/%d/%Y",
+        "xano": "ISO8601",
+    }
+
+
+def test_mixed_formats_within_one_source():
+    parsed = parse_dates(["2024-03-06", "March 07, 2024"], sources=["Meetup"] * 2)
+    assert list(parsed) == [pd.Timestamp("2024-03-06"), pd.Timestamp("2024-03-07")]
+
+
+def test_missing_dates_are_nat():
+    parsed = parse_dates(["2024-03-06", None, ""])
+    assert parsed.isna().tolist() == [False, True, True]
+    assert to_iso(parsed) == ["2024-03-06T00:00:00", None, None]
+
+
+def test_unparseable_date_raises():
+    with pytest.raises(ValueError, match="No valid date format found"):
+        parse_dates(["2024-03-06", "next tuesday"])
+
+
+def test_unparseable_date_is_nat_with_coerce():
+    parsed = parse_dates(["next tuesday"], errors="coerce")
+    assert parsed.isna().all()
@@ -0,0 +1,74 @@
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from PIL import Image
+
+import src.image_utils as image_utils
+import src.xano_scripts as xano_scripts
+from src.image_cache import ImageCache
+from src.mock_xano_server import MockXanoServer
+from src.token_bucket import configure_rate_limits
+
+
+def png_bytes(size):
+    buffer = BytesIO()
+    Image.new("RGB", size, "red").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class FakeSession:
+    def __init__(self):
+        self.downloads = 0
+
+    def get(self, url, headers=None):
+        self.downloads += 1
+        response = requests.Response()
+        response.status_code = 200
+        response._content = png_bytes((40 + self.downloads, 30))
+        return response
+
+
+def test_prepare_images_in_chunks(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(image_utils, "get_session", lambda: session)
+    urls = [f"https://img.test/{i}.png" for i in range(5)]
+
+    prepared = image_utils.prepare_images(
+        urls + urls[:2], max_processes=1, chunk_size=2
+    )
+
+    assert sorted(prepared) == sorted(urls)
+    assert session.downloads == 5
+    for jpg_image in prepared.values():
+        assert Image.open(BytesIO(jpg_image)).format == "JPEG"
+
+
+def test_shared_photo_is_uploaded_once_across_workers(tmp_path):
+    configure_rate_limits({"xano_image": {"tokens": 1000, "fill_rate": 1000}})
+    image_cache = ImageCache(tmp_path)
+    urls = [f"https://img.test/{i}.png" for i in range(3)]
+    prepared = {}
+    for i, url in enumerate(urls):
+        prepared[url] = png_bytes((40 + i, 30))
+        image_cache.put_image(url, prepared[url])
+
+    with MockXanoServer(latency=0.05) as server:
+        image_endpoint_url = server.endpoints()["image_endpoint_url"]
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            photos = list(
+                executor.map(
+                    lambda url: xano_scripts.upload_photo(
+                        url,
+                        {},
+                        image_endpoint_url,
+                        image_cache,
+                        prepared_images=prepared,
+                    ),
+                    urls * 2,
+                )
+            )
+        uploads = server.requests["POST"]
+
+    assert uploads == 3
+    assert photos[:3] == photos[3:]
@@ -0,0 +1,51 @@
+import pandas as pd
+
+from src.near_duplicates import merge_near_duplicates
+
+DESCRIPTION = (
+    "Join us for an evening of talks on applied machine learning in production, "
+    "with short demos by local startups, pizza and drinks, and plenty of time to "
+    "meet engineers and founders from the Berlin AI community afterwards."
+)
+
+
+def events(rows):
+    return pd.DataFrame(rows, columns=["Name", "Long_Description", "Date", "Source"])
+
+
+def test_cross_posted_event_is_merged_with_keywords_and_sources_unioned():
+    df = events(
+        [
+            ["AI Night Berlin", DESCRIPTION, "March 05, 2024", "Eventbrite"],
+            ["Pottery class", "Hands on clay for beginners.", "2024-03-05", "Meetup"],
+            ["AI Night - Berlin", DESCRIPTION + " RSVP!", "2024-03-05", "Meetup"],
+        ]
+    ).assign(Keyword=["ai,data", "art", "data,berlin"])
+    merged = merge_near_duplicates(df)
+    assert list(merged.index) == [0, 1]
+    assert merged.loc[0, "Keyword"] == "ai,data,berlin"
+    assert merged.loc[0, "Source"] == "Eventbrite,Meetup"
+    assert merged.loc[1, "Keyword"] == "art"
+
+
+def test_same_text_on_different_days_is_kept_apart():
+    df = events(
+        [
+            ["AI Night Berlin", DESCRIPTION, "2024-03-05", "Meetup"],
+            ["AI Night Berlin", DESCRIPTION, "2024-04-02", "Meetup"],
+        ]
+    ).assign(Keyword="ai")
+    assert len(merge_near_duplicates(df)) == 2
+
+
+def test_empty_texts_are_never_grouped():
+    df = events(
+        [
+            [None, None, "2024-03-05", "Meetup"],
+            ["", "", "2024-03-05", "Meetup"],
+            ["", "...", "2024-03-05", "Eventbrite"],
+        ]
+    ).assign(Keyword=["ai", "web3", "data"])
+    merged = merge_near_duplicates(df)
+    assert len(merged) == 3
+    assert list(merged["Keyword"]) == ["ai", "web3", "data"]
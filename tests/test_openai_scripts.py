@@ -0,0 +1,61 @@
+import pandas as pd
+
+import src.openai_scripts as openai_scripts
+from src.openai_scripts import trim_to_limits, within_limits
+
+LONG_WITH_ABBREVIATION = (
+    "Join Dr. Smith and friends for an evening of talks about machine learning "
+    "in production and how to build reliable AI systems, followed by pizza, "
+    "drinks and open networking afterwards"
+)
+
+
+def test_sentence_cut_shorter_than_char_min_falls_back_to_word_cut():
+    trimmed = trim_to_limits(LONG_WITH_ABBREVIATION, 170, 48)
+    assert within_limits(trimmed, 170, 48)
+    assert trimmed.startswith("Join Dr. Smith") and trimmed.endswith(".")
+
+
+def test_cuts_at_last_sentence_end_within_limits():
+    text = (
+        "Founders and investors meet in Berlin to share what works. Then they "
+        "network and talk about startups and scaling for hours with drinks."
+    )
+    assert (
+        trim_to_limits(text, 100, 48)
+        == "Founders and investors meet in Berlin to share what works."
+    )
+
+
+def test_short_enough_output_is_unchanged():
+    assert trim_to_limits("A short summary.", 170, 48) == "A short summary."
+
+
+def test_only_rows_that_are_sent_are_prepared(monkeypatch):
+    prepared, logged = [], []
+
+    def prepare(text, max_tokens=None):
+        prepared.append(text)
+        return text.strip(), 10, 4
+
+    monkeypatch.setattr(openai_scripts, "prepare_input_text", prepare)
+    monkeypatch.setattr(
+        openai_scripts, "log_tokens_saved", lambda *counts: logged.append(counts)
+    )
+    monkeypatch.setattr(
+        openai_scripts, "summarize_text", lambda api_key, prompt, text, *args: text
+    )
+    data = pd.DataFrame(
+        {"Description": [" kept ", " sent "], "Summary": ["existing", None]}
+    )
+    data = openai_scripts.openai_loop_over_column_and_add(
+        "key",
+        "prompt",
+        data,
+        "Description",
+        "Summary",
+        prepare_input=True,
+        skip_existing=True,
+    )
+    assert prepared == [" sent "] and logged == [(10, 4)]
+    assert [row["Summary"] for row in data] == ["existing", "sent"]
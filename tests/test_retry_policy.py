@@ -0,0 +1,116 @@
+import time
+
+import pytest
+import requests
+
+import src.xano_scripts as xano_scripts
+from src.retry_policy import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceededError,
+    configure_retry_policy,
+    endpoint_name,
+    get_circuit_breaker,
+    get_retry_policy,
+)
+from src.token_bucket import (
+    DEFAULT_RATE_LIMITS,
+    XANO_CRUD,
+    configure_rate_limits,
+    get_bucket,
+)
+
+URL = "http://xano.test/api/events/1"
+
+
+class FakeSession:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        response = requests.Response()
+        if isinstance(outcome, tuple):  # status code and headers
+            outcome, headers = outcome
+            response.headers.update(headers)
+        response.status_code = outcome
+        response.url = url
+        return response
+
+
+@pytest.fixture
+def session(monkeypatch):
+    configure_retry_policy({"base_delay": 0, "max_delay": 0})
+
+    def install(outcomes):
+        fake = FakeSession(outcomes)
+        monkeypatch.setattr(xano_scripts, "get_session", lambda: fake)
+        return fake
+
+    yield install
+    configure_retry_policy()
+    configure_rate_limits(DEFAULT_RATE_LIMITS)
+
+
+def test_broken_body_is_retried(session):
+    fake = session([requests.exceptions.ChunkedEncodingError("cut off"), 200])
+    response = xano_scripts.send_request_with_retry(URL, "GET", {})
+    assert response.status_code == 200 and fake.calls == 2
+
+
+def test_client_error_is_not_retried(session):
+    fake = session([404, 200])
+    with pytest.raises(requests.exceptions.HTTPError):
+        xano_scripts.send_request_with_retry(URL, "GET", {})
+    assert fake.calls == 1
+
+
+def test_retry_after_beyond_the_deadline_is_not_waited_out(session):
+    configure_rate_limits({XANO_CRUD: {"tokens": 10, "fill_rate": 1}})
+    configure_retry_policy(
+        {"base_delay": 0, "max_delay": 0, "request_deadline": 1, "run_deadline": 2}
+    )
+    get_retry_policy().start_run()
+    fake = session([(429, {"Retry-After": "5"}), 200])
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceededError):
+        xano_scripts.send_request_with_retry(URL, "GET", {})
+    assert time.monotonic() - start < 0.5 and fake.calls == 1
+
+
+def test_rate_limit_beyond_the_deadline_is_not_waited_out(session):
+    configure_rate_limits({XANO_CRUD: {"tokens": 10, "fill_rate": 1}})
+    configure_retry_policy({"base_delay": 0, "max_delay": 0, "request_deadline": 1})
+    get_bucket(XANO_CRUD).drain(600)
+    fake = session([200])
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceededError):
+        xano_scripts.send_request_with_retry(URL, "GET", {})
+    assert time.monotonic() - start < 0.5 and fake.calls == 0
+
+
+def test_unexpected_error_in_half_open_trial_does_not_block_endpoint(session):
+    breaker = get_circuit_breaker(endpoint_name("GET", URL))
+    breaker.cooldown = 0
+    breaker._opened_at = 0.0  # open, with the cooldown over
+    session([ValueError("unexpected"), 200])
+    with pytest.raises(ValueError):
+        xano_scripts.send_request_with_retry(URL, "GET", {})
+    assert xano_scripts.send_request_with_retry(URL, "GET", {}).status_code == 200
+    assert not breaker.is_open
+
+
+def test_breaker_opens_and_half_open_trial_closes_it():
+    breaker = CircuitBreaker("test", window=4, min_calls=2, cooldown=0)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.is_open
+    breaker.before_request()  # the trial call
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.record_success()
+    assert not breaker.is_open
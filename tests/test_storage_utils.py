@@ -0,0 +1,69 @@
+import time
+import sqlite3
+
+from src.language_detection import LanguageCache
+from src.storage_utils import AppendOnlyLog
+from src.summary_cache import SummaryCache
+from src.summary_checkpoint import SummaryCheckpoint
+
+
+class RecordLog(AppendOnlyLog):
+    def __init__(self, path):
+        self.records = []
+        super().__init__(path)
+
+    def replay(self, record):
+        self.records.append(record)
+
+
+def test_torn_last_line_is_skipped_and_not_merged_with_the_next(tmp_path):
+    path = tmp_path / "log.jsonl"
+    path.write_text('{"n": 1}\n{"n": 2, "cut', encoding="utf-8")
+
+    log = RecordLog(path)
+    assert log.resumed and log.records == [{"n": 1}]
+    log.write({"n": 3})
+    log.close()
+    assert RecordLog(path).records == [{"n": 1}, {"n": 3}]
+
+
+def test_finished_log_is_removed(tmp_path):
+    log = RecordLog(tmp_path / "log.jsonl")
+    log.write({"n": 1})
+    log.close(finished=True)
+    assert not (tmp_path / "log.jsonl").exists()
+
+
+def test_checkpoint_resumes_summaries(tmp_path):
+    checkpoint = SummaryCheckpoint(tmp_path / "checkpoint.jsonl")
+    checkpoint.append("k1", 0, "First summary.")
+    checkpoint.close()
+    assert SummaryCheckpoint(tmp_path / "checkpoint.jsonl").get("k1") == (
+        "First summary."
+    )
+
+
+def test_language_cache_keeps_undetectable_texts(tmp_path):
+    cache = LanguageCache(tmp_path / "languages.sqlite")
+    cache.put_many({"k1": "de", "k2": None})
+    assert cache.get_many(["k1", "k2", "k3"]) == {"k1": "de", "k2": None}
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_unused_entries_are_evicted_on_open(tmp_path):
+    SummaryCache(tmp_path / "summaries.sqlite").put("k1", "A summary.")
+    assert SummaryCache(tmp_path / "summaries.sqlite").get("k1") == "A summary."
+    assert SummaryCache(tmp_path / "summaries.sqlite", max_age=-1).get("k1") is None
+
+
+def test_summary_cache_opens_the_previous_schema(tmp_path):
+    db = sqlite3.connect(str(tmp_path / "summaries.sqlite"))
+    db.execute(
+        "CREATE TABLE summaries (key TEXT PRIMARY KEY, summary TEXT, "
+        "created_at REAL, last_access REAL)"
+    )
+    db.execute("INSERT INTO summaries VALUES ('k1', 'Old.', 0, ?)", (time.time(),))
+    db.commit()
+    cache = SummaryCache(tmp_path / "summaries.sqlite")
+    cache.put("k2", "New.")
+    assert cache.get_many(["k1", "k2"]) == {"k1": "Old.", "k2": "New."}
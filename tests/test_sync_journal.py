@@ -0,0 +1,113 @@
+import datetime
+
+import pandas as pd
+import requests
+
+import src.xano_scripts as xano_scripts
+from src.mock_xano_server import MockXanoServer
+from src.retry_policy import configure_retry_policy
+from src.sync_journal import SyncJournal, operation_token
+from src.sync_plan import ACTION_CREATE, ACTION_SKIP, ACTION_UPDATE
+from src.token_bucket import configure_rate_limits
+
+
+def future_rows(count):
+    date = (datetime.date.today() + datetime.timedelta(days=10)).isoformat()
+    return [
+        {"Link": f"l{i}", "Date": date, "Name": f"N{i}", "Archived": False}
+        for i in range(count)
+    ]
+
+
+def test_token_is_keyed_by_link_action_and_written_fingerprint():
+    assert operation_token("l1", "create", "f1") == operation_token("l1", "create")
+    assert operation_token("l1", "create") != operation_token("l1", "update")
+    assert operation_token("l1", "update", "f1") != operation_token(
+        "l1", "update", "f2"
+    )
+
+
+def test_journal_of_another_run_is_discarded(tmp_path):
+    journal = SyncJournal(tmp_path / "journal.jsonl", "run1")
+    journal.complete(operation_token("l1", ACTION_CREATE), "l1", "create", 1)
+    journal.close()
+
+    assert list(SyncJournal(tmp_path / "journal.jsonl", "run1").done)
+    journal = SyncJournal(tmp_path / "journal.jsonl", "run2")
+    assert not journal.done
+    journal.close()
+    assert not SyncJournal(tmp_path / "journal.jsonl", "run2").done
+
+
+def test_done_update_does_not_hide_a_later_change(tmp_path):
+    journal = SyncJournal(tmp_path / "journal.jsonl")
+    journal.complete(operation_token("a", ACTION_UPDATE, "old"), "a", "edit", 1)
+    plan = pd.DataFrame(
+        {"link": ["a"], "action": [ACTION_UPDATE], "row": [1], "fingerprint": ["new"]}
+    )
+    plan["token"] = [operation_token("a", ACTION_UPDATE, "new")]
+    assert list(xano_scripts.reconcile_journal(plan, journal, {})["link"]) == ["a"]
+    journal.close()
+
+
+def test_done_operation_is_skipped_and_pending_create_reconciled(tmp_path):
+    journal = SyncJournal(tmp_path / "journal.jsonl")
+    journal.complete(operation_token("l1", ACTION_CREATE), "l1", "create", 1)
+    journal.start(operation_token("l2", ACTION_CREATE), "l2", "create")
+    journal.close()
+
+    journal = SyncJournal(tmp_path / "journal.jsonl")
+    assert journal.pending_creates() == ["l2"]
+    plan = pd.DataFrame(
+        {
+            "link": ["l1", "l2", "l3"],
+            "action": [ACTION_CREATE, ACTION_SKIP, ACTION_CREATE],
+            "row": [1, 2, 3],
+        }
+    )
+    plan["token"] = [
+        operation_token(l, a) for l, a in zip(plan["link"], plan["action"])
+    ]
+    resumed = xano_scripts.reconcile_journal(plan, journal, {"l2": {"id": 2}})
+    assert list(resumed["link"]) == ["l2", "l3"]
+    journal.close()
+
+
+def test_create_with_lost_response_is_deferred_not_duplicated(tmp_path, monkeypatch):
+    configure_rate_limits({"xano_crud": {"tokens": 1000, "fill_rate": 1000}})
+    configure_retry_policy({"base_delay": 0, "max_delay": 0})
+    journal_path = tmp_path / "journal.jsonl"
+    rows = future_rows(6)
+
+    with MockXanoServer() as server:
+        endpoints = server.endpoints()
+        endpoints.pop("bulk_endpoint_url")
+        session = xano_scripts.get_session()
+
+        class LosingSession:
+            # the create of l3 reaches the server but its response is lost
+            def get(self, url, **kwargs):
+                return session.get(url, **kwargs)
+
+            def request(self, method, url, **kwargs):
+                response = session.request(method, url, **kwargs)
+                if method == "POST" and '"l3"' in (kwargs.get("data") or ""):
+                    raise requests.exceptions.ReadTimeout("response lost")
+                return response
+
+        monkeypatch.setattr(xano_scripts, "get_session", LosingSession)
+        xano_scripts.send_data_to_xano(
+            rows, "key", table_name="T", journal_path=journal_path, **endpoints
+        )
+        assert len(server.records) == 6
+        assert journal_path.exists()  # the uncertain create keeps the journal
+
+        monkeypatch.setattr(xano_scripts, "get_session", lambda: session)
+        xano_scripts.send_data_to_xano(
+            rows, "key", table_name="T", journal_path=journal_path, **endpoints
+        )
+        links = sorted(record["Link"] for record in server.records.values())
+        assert links == [f"l{i}" for i in range(6)]
+        assert not journal_path.exists()
+
+    configure_retry_policy()
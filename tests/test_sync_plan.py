@@ -0,0 +1,99 @@
+import datetime
+
+import pandas as pd
+
+from src.sync_plan import (
+    ACTION_ARCHIVE,
+    ACTION_CREATE,
+    ACTION_DELETE,
+    ACTION_SKIP,
+    ACTION_UPDATE,
+    build_sync_plan,
+    summarize_plan,
+)
+
+YESTERDAY = datetime.date(2024, 3, 9)
+FUTURE = "2024-03-20T18:00:00"
+PAST = "2024-03-01T18:00:00"
+
+
+def existing_entry(record_id, date, fingerprint="f", archived=False, bookmarks=None):
+    return {
+        "id": record_id,
+        "Date": pd.Timestamp(date),
+        "Archived": archived,
+        "bookmark_users_id": bookmarks or [],
+        "fingerprint": fingerprint,
+    }
+
+
+def plan_for(rows, existing_entries):
+    plan = build_sync_plan(
+        [{"Link": link, "Date": date} for link, date, fingerprint in rows],
+        existing_entries,
+        [fingerprint for link, date, fingerprint in rows],
+        YESTERDAY,
+    )
+    return dict(zip(plan["link"], plan["action"]))
+
+
+def test_incoming_rows():
+    actions = plan_for(
+        [
+            ("new", FUTURE, "f"),
+            ("unchanged", FUTURE, "f"),
+            ("changed", FUTURE, "g"),
+            ("past", PAST, "f"),
+        ],
+        {
+            "unchanged": existing_entry(1, FUTURE),
+            "changed": existing_entry(2, FUTURE),
+        },
+    )
+    assert actions == {
+        "new": ACTION_CREATE,
+        "unchanged": ACTION_SKIP,
+        "changed": ACTION_UPDATE,
+        "past": ACTION_SKIP,
+    }
+
+
+def test_past_existing_records():
+    actions = plan_for(
+        [],
+        {
+            "gone": existing_entry(1, PAST),
+            "bookmarked": existing_entry(2, PAST, bookmarks=[7]),
+            "archived": existing_entry(3, PAST, archived=True, bookmarks=[7]),
+            "upcoming": existing_entry(4, FUTURE),
+        },
+    )
+    assert actions == {
+        "gone": ACTION_DELETE,
+        "bookmarked": ACTION_ARCHIVE,
+        "archived": ACTION_SKIP,
+    }
+
+
+def test_rescheduled_record_is_updated_not_deleted():
+    plan = build_sync_plan(
+        [{"Link": "moved", "Date": FUTURE}],
+        {"moved": existing_entry(1, PAST, fingerprint="old")},
+        ["new"],
+        YESTERDAY,
+    )
+    assert list(plan["action"]) == [ACTION_UPDATE]
+    assert plan["row"].iloc[0] == 1
+
+
+def test_summary_counts_requests():
+    plan = build_sync_plan(
+        [{"Link": "a", "Date": FUTURE, "Photo": "x"}, {"Link": "b", "Date": FUTURE}],
+        {"old": existing_entry(1, PAST)},
+        ["f", "f"],
+        YESTERDAY,
+    )
+    summary = summarize_plan(plan, bulk_size=2)
+    assert summary[ACTION_CREATE] == 2 and summary[ACTION_DELETE] == 1
+    assert summary["photo_uploads"] == 1
+    assert summary["write_requests"] == 2
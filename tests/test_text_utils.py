@@ -0,0 +1,50 @@
+from src.text_utils import clean_paragraphs, prepare_input_text
+
+
+def test_join_us_description_is_kept():
+    text = "Join us for a hands-on AI workshop in Berlin where we build agents."
+    assert prepare_input_text(text)[0] == text
+
+
+def test_register_description_is_kept():
+    text = (
+        "Register now for the Berlin AI summit on March 5 with 20 speakers\n"
+        "Doors open at 6pm."
+    )
+    assert prepare_input_text(text)[0] == text
+
+
+def test_call_to_action_lines_are_dropped():
+    text = (
+        "Talks on AI and pizza.\nRegister here: https://example.com/e/1\n"
+        "Get your tickets now!\nBook online\nSign up below."
+    )
+    assert clean_paragraphs(text) == "Talks on AI and pizza."
+
+
+def test_cookie_policy_mention_in_long_line_is_kept():
+    text = (
+        "An evening of talks on applied machine learning, followed by networking. "
+        "By registering you accept our cookie policy and the code of conduct."
+    )
+    assert prepare_input_text(text)[0] == text
+
+
+def test_short_boilerplate_lines_are_dropped():
+    text = "Talks on AI and pizza.\nFollow us on Twitter\nRSVP below\nTalks on AI and pizza."
+    assert clean_paragraphs(text) == "Talks on AI and pizza."
+
+
+def test_html_is_stripped():
+    text = "<p>Talks &amp; drinks</p><script>track()</script><div>in Berlin</div>"
+    assert prepare_input_text(text)[0] == "Talks & drinks\nin Berlin"
+
+
+def test_never_returns_empty_text():
+    assert prepare_input_text("<p>Register now</p>")[0] == "Register now"
+
+
+def test_token_budget_is_applied():
+    text, tokens_before, tokens_after = prepare_input_text("word " * 1000, 50)
+    assert tokens_after <= 50 < tokens_before
+    assert text.startswith("word word")
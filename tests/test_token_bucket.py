@@ -0,0 +1,86 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from src.token_bucket import (
+    DEFAULT_RATE_LIMITS,
+    TokenBucket,
+    configure_rate_limits,
+    get_bucket,
+)
+
+
+def test_bucket_recovers_after_the_burst():
+    bucket = TokenBucket(tokens=2, fill_rate=20)
+    assert bucket.consume(1) == 0 and bucket.consume(1) == 0
+    assert bucket.consume(1) == pytest.approx(0.05, abs=0.01)
+    time.sleep(0.2)  # long enough to refill the whole burst
+    assert bucket.consume(1) == 0 and bucket.consume(1) == 0
+
+
+def test_refill_is_capped_at_capacity():
+    bucket = TokenBucket(tokens=2, fill_rate=1000)
+    time.sleep(0.01)
+    bucket.refill()
+    assert bucket._tokens == 2
+
+
+def test_concurrent_callers_queue_behind_each_other():
+    bucket = TokenBucket(tokens=1, fill_rate=10)
+    waits = []
+    lock = threading.Lock()
+
+    def take():
+        wait = bucket.consume(1)
+        with lock:
+            waits.append(wait)
+
+    threads = [threading.Thread(target=take) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # every caller reserved its own token, one tenth of a second apart
+    assert sorted(waits) == pytest.approx([0, 0.1, 0.2, 0.3, 0.4], abs=0.02)
+
+
+def test_drain_holds_back_the_next_token():
+    bucket = TokenBucket(tokens=5, fill_rate=10)
+    bucket.drain(0.5)
+    assert bucket.consume(1) == pytest.approx(0.6, abs=0.02)
+
+
+def test_acquire_gives_up_without_reserving_past_the_deadline():
+    bucket = TokenBucket(tokens=1, fill_rate=10)
+    bucket.drain(5)
+    assert bucket.acquire(deadline=time.monotonic() + 0.1) is None
+    # nothing was reserved, the next caller waits only for the drain
+    assert bucket.consume(1) == pytest.approx(5.1, abs=0.02)
+
+
+def test_acquire_async_waits_for_the_token():
+    bucket = TokenBucket(tokens=1, fill_rate=20)
+    bucket.consume(1)
+    start = time.monotonic()
+    asyncio.run(bucket.acquire_async())
+    assert time.monotonic() - start >= 0.04
+
+
+def test_configure_rate_limits_replaces_handed_out_buckets():
+    bucket = get_bucket("openai")
+    configure_rate_limits({"openai": {"fill_rate": 50}})
+    try:
+        configured = get_bucket("openai")
+        assert configured is not bucket
+        assert configured.fill_rate == 50
+        assert configured.capacity == DEFAULT_RATE_LIMITS["openai"]["tokens"]
+    finally:
+        configure_rate_limits(DEFAULT_RATE_LIMITS)
+
+
+def test_unknown_bucket_is_rejected():
+    with pytest.raises(ValueError):
+        get_bucket("unknown")
@@ -0,0 +1,39 @@
+from src.xano_scripts import entry_fingerprint, normalize_field
+
+ENTRY = {
+    "Link": "https://example.com/event/1",
+    "Name": "AI Meetup",
+    "Date": "2024-03-05T18:00:00",
+    "Highlights": None,
+    "Price": 10,
+    "bookmark_users_id": [0],
+}
+
+
+def test_only_the_date_part_is_compared():
+    assert entry_fingerprint(ENTRY) == entry_fingerprint(
+        {**ENTRY, "Date": "2024-03-05T09:30:00.000Z"}
+    )
+    assert entry_fingerprint(ENTRY) != entry_fingerprint(
+        {**ENTRY, "Date": "2024-03-06T18:00:00"}
+    )
+
+
+def test_highlights_zero_equals_none():
+    assert normalize_field("Highlights", 0.0) is None
+    assert entry_fingerprint(ENTRY) == entry_fingerprint({**ENTRY, "Highlights": 0.0})
+    assert entry_fingerprint(ENTRY) != entry_fingerprint({**ENTRY, "Highlights": 2})
+
+
+def test_number_equals_one_element_list():
+    assert entry_fingerprint(ENTRY) == entry_fingerprint({**ENTRY, "Price": [10.0]})
+    assert entry_fingerprint(ENTRY) == entry_fingerprint(
+        {**ENTRY, "bookmark_users_id": 0}
+    )
+    assert entry_fingerprint(ENTRY) != entry_fingerprint({**ENTRY, "Price": [10, 20]})
+
+
+def test_ignored_fields_are_left_out():
+    changed = {**ENTRY, "Name": "Renamed"}
+    assert entry_fingerprint(ENTRY) != entry_fingerprint(changed)
+    assert entry_fingerprint(ENTRY, ["Name"]) == entry_fingerprint(changed, ["Name"])